@@ -1,6 +1,6 @@
 from django.contrib import admin
 from parler.admin import TranslatableAdmin
-from .models import CompanyInfo, ContactInfo, Employee, FAQ, Newsletter
+from .models import CompanyInfo, ContactInfo, Employee, FAQ, Newsletter, NewsletterCampaign
 
 from django.contrib import messages
 from googletrans import Translator
@@ -225,4 +225,22 @@ Za odjavu, kontaktirajte nas na {settings.DEFAULT_FROM_EMAIL}
             f'You can export the list as CSV and import it there.'
         )
     
-    send_bulk_email.short_description = '📨 Bulk email info'
\ No newline at end of file
+    send_bulk_email.short_description = '📨 Bulk email info'
+
+
+@admin.register(NewsletterCampaign)
+class NewsletterCampaignAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'status', 'sent_count', 'failed_count', 'created_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['subject']
+    readonly_fields = ['status', 'sent_count', 'failed_count', 'last_subscriber_id', 'created_at', 'started_at', 'finished_at']
+    fieldsets = (
+        (None, {
+            'fields': ('subject', 'body'),
+            'description': 'Send with: python manage.py send_newsletter --campaign &lt;id&gt;. '
+                           'The body may use %%name%% for the subscriber\'s name.',
+        }),
+        ('Delivery', {
+            'fields': ('status', 'sent_count', 'failed_count', 'last_subscriber_id', 'created_at', 'started_at', 'finished_at'),
+        }),
+    )
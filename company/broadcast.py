@@ -0,0 +1,203 @@
+"""
+Newsletter campaigns.
+
+    broadcast(campaign, batch_size=100, rate=10)
+
+Active subscribers are walked in id order, one batch at a time, starting
+after the campaign's last_subscriber_id, so only one batch is ever in
+memory and an interrupted run resumes where it stopped. Each batch gets
+its NewsletterDelivery rows (queued) before anything is sent; a subscriber
+with a delivery row is never mailed again by the same campaign. An
+interrupted batch releases the rows it never got to, but if the process
+is killed outright the rest of that batch stays queued and is skipped
+rather than risk sending it twice.
+
+The email is rendered once per campaign with %%name%% and
+%%unsubscribe_url%% placeholders, filled in per subscriber with plain
+string replacement, and everything goes out over one SMTP connection.
+"""
+import time
+from html import escape
+from smtplib import SMTPServerDisconnected
+
+from django.conf import settings
+from django.core import signing
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone, translation
+
+from .models import Newsletter, NewsletterCampaign, NewsletterDelivery
+
+UNSUBSCRIBE_SALT = 'company.newsletter.unsubscribe'
+
+# Per-subscriber fields; campaign bodies may use these markers too
+PLACEHOLDER_FIELDS = ('name', 'unsubscribe_url')
+
+
+def unsubscribe_token(subscriber_id):
+    return signing.Signer(salt=UNSUBSCRIBE_SALT).sign(str(subscriber_id))
+
+
+def subscriber_id_from_token(token):
+    """The subscriber id a token was signed for, or None if it was tampered with."""
+    try:
+        return int(signing.Signer(salt=UNSUBSCRIBE_SALT).unsign(token))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def unsubscribe_url(subscriber_id):
+    with translation.override(settings.LANGUAGE_CODE):
+        path = reverse('newsletter_unsubscribe', args=[unsubscribe_token(subscriber_id)])
+    return settings.SITE_URL.rstrip('/') + path
+
+
+class CampaignMessage:
+    """A campaign's email, rendered once."""
+
+    def __init__(self, campaign):
+        context = {
+            'campaign': campaign,
+            'subscriber': {field: f'%%{field}%%' for field in PLACEHOLDER_FIELDS},
+        }
+        self.subject = campaign.subject
+        self.text = render_to_string('emails/newsletter.txt', context)
+        self.html = render_to_string('emails/newsletter.html', context)
+
+    def message(self, subscriber_id, email, name, connection=None):
+        values = {'name': name or 'there', 'unsubscribe_url': unsubscribe_url(subscriber_id)}
+        subject, text, html = self.subject, self.text, self.html
+        for field, value in values.items():
+            marker = f'%%{field}%%'
+            subject = subject.replace(marker, value)
+            text = text.replace(marker, value)
+            html = html.replace(marker, escape(value))
+
+        message = EmailMultiAlternatives(
+            subject=subject,
+            body=text,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[email],
+            connection=connection,
+            headers={
+                # One-click unsubscribe (RFC 8058): mail clients POST to the URL
+                'List-Unsubscribe': f"<{values['unsubscribe_url']}>",
+                'List-Unsubscribe-Post': 'List-Unsubscribe=One-Click',
+            },
+        )
+        message.attach_alternative(html, "text/html")
+        return message
+
+
+def _next_batch(campaign, batch_size):
+    """(id, email, name) rows for the next batch of active subscribers after the cursor."""
+    return list(
+        Newsletter.objects
+        .filter(is_active=True, pk__gt=campaign.last_subscriber_id)
+        .order_by('pk')
+        .values_list('pk', 'email', 'name')[:batch_size]
+    )
+
+
+def _queue(campaign, batch):
+    """Create queued deliveries for the batch; returns the rows not already handled."""
+    handled = set(
+        NewsletterDelivery.objects
+        .filter(campaign=campaign, subscriber_id__in=[row[0] for row in batch])
+        .values_list('subscriber_id', flat=True)
+    )
+    pending = [row for row in batch if row[0] not in handled]
+    NewsletterDelivery.objects.bulk_create(
+        [NewsletterDelivery(campaign=campaign, subscriber_id=row[0]) for row in pending],
+        ignore_conflicts=True,
+    )
+    return pending
+
+
+def _record(campaign, delivered, undelivered, unsent, last_id):
+    deliveries = NewsletterDelivery.objects.filter(campaign=campaign)
+    if delivered:
+        deliveries.filter(subscriber_id__in=delivered).update(status=NewsletterDelivery.SENT)
+    if undelivered:
+        deliveries.filter(subscriber_id__in=undelivered).update(status=NewsletterDelivery.FAILED)
+    if unsent:
+        deliveries.filter(subscriber_id__in=unsent, status=NewsletterDelivery.QUEUED).delete()
+    else:
+        campaign.last_subscriber_id = last_id
+    NewsletterCampaign.objects.filter(pk=campaign.pk).update(
+        last_subscriber_id=campaign.last_subscriber_id,
+        sent_count=F('sent_count') + len(delivered),
+        failed_count=F('failed_count') + len(undelivered),
+    )
+
+
+def _send(email, connection):
+    try:
+        email.send()
+    except SMTPServerDisconnected:
+        # Servers drop long-lived connections; reconnect once and retry
+        connection.close()
+        connection.open()
+        email.send()
+
+
+def broadcast(campaign, batch_size=100, rate=10.0, dry_run=False, log=print):
+    """
+    Send (or resume sending) a campaign; returns (sent, failed) for this run.
+
+    rate -- messages per second at most; 0 for no limit
+    """
+    if dry_run:
+        remaining = Newsletter.objects.filter(is_active=True, pk__gt=campaign.last_subscriber_id).count()
+        log(f"  {remaining} active subscribers left for \"{campaign}\"")
+        return remaining, 0
+
+    if campaign.status != 'sending':
+        campaign.status = 'sending'
+        campaign.started_at = campaign.started_at or timezone.now()
+        campaign.save(update_fields=['status', 'started_at'])
+
+    mail = CampaignMessage(campaign)
+    sent = failed = 0
+    connection = get_connection()
+    connection.open()
+    try:
+        while True:
+            batch = _next_batch(campaign, batch_size)
+            if not batch:
+                break
+            started = time.monotonic()
+
+            pending = _queue(campaign, batch)
+            delivered, undelivered, tried = [], [], set()
+            try:
+                for subscriber_id, email, name in pending:
+                    tried.add(subscriber_id)
+                    try:
+                        _send(mail.message(subscriber_id, email, name, connection), connection)
+                        delivered.append(subscriber_id)
+                    except Exception as e:
+                        log(f"✗ Newsletter to {email} failed: {e}")
+                        undelivered.append(subscriber_id)
+            finally:
+                # Also runs when the command is interrupted mid-batch: the
+                # unsent rest of the batch is released for the next run.
+                # The cursor only moves past a batch once all of it was tried.
+                unsent = [row[0] for row in pending if row[0] not in tried]
+                _record(campaign, delivered, undelivered, unsent, batch[-1][0])
+            sent += len(delivered)
+            failed += len(undelivered)
+            log(f"  {sent} sent, {failed} failed (up to subscriber #{campaign.last_subscriber_id})")
+
+            if rate:
+                delay = (len(delivered) + len(undelivered)) / rate - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+    finally:
+        connection.close()
+
+    NewsletterCampaign.objects.filter(pk=campaign.pk).update(status='sent', finished_at=timezone.now())
+    campaign.refresh_from_db()
+    return sent, failed
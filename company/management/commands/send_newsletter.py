@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from company.broadcast import broadcast
+from company.models import NewsletterCampaign
+
+'''
+python3 manage.py send_newsletter --campaign 3
+python3 manage.py send_newsletter --campaign 3 --rate 5 --batch_size 200
+
+Resumable: if a run is interrupted, run the same command again and it
+continues after the last subscriber that was handled. Don't run two at
+once for the same campaign.
+'''
+
+class Command(BaseCommand):
+    help = "Send a newsletter campaign to all active subscribers"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--campaign", type=int, required=True, help="NewsletterCampaign id")
+        parser.add_argument("--batch_size", type=int, default=100, help="Subscribers per batch")
+        parser.add_argument("--rate", type=float, default=10.0, help="Max messages per second (0 = unlimited)")
+        parser.add_argument("--dry_run", action="store_true", help="Count remaining recipients without sending")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch_size must be at least 1")
+        if options["rate"] < 0:
+            raise CommandError("--rate can't be negative")
+        try:
+            campaign = NewsletterCampaign.objects.get(pk=options["campaign"])
+        except NewsletterCampaign.DoesNotExist:
+            raise CommandError(f"Campaign {options['campaign']} not found")
+        if campaign.status == 'sent':
+            raise CommandError(f"\"{campaign}\" has already been sent")
+
+        sent, failed = broadcast(
+            campaign,
+            batch_size=options["batch_size"],
+            rate=options["rate"],
+            dry_run=options["dry_run"],
+            log=self.stdout.write,
+        )
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"Would send {sent} emails"))
+            return
+        self.stdout.write(self.style.SUCCESS(f"✅ Sent \"{campaign}\" to {sent} subscribers"))
+        if failed:
+            self.stdout.write(self.style.WARNING(f"{failed} failed; see the campaign's deliveries in the admin"))
@@ -100,4 +100,49 @@ class Newsletter(models.Model):
         ordering = ['-subscribed_at']
 
     def __str__(self):
-        return self.email
\ No newline at end of file
+        return self.email
+
+class NewsletterCampaign(models.Model):
+    """A newsletter email broadcast to all active subscribers (company.broadcast)."""
+    STATUS_CHOICES = [
+        ('draft', 'Draft'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+    ]
+    subject = models.CharField(max_length=200)
+    body = models.TextField(help_text="Plain text; blank lines separate paragraphs in the HTML version.")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
+    # Keyset cursor: every active subscriber with a lower id has been handled,
+    # so an interrupted broadcast picks up where it stopped
+    last_subscriber_id = models.PositiveIntegerField(default=0, editable=False)
+    sent_count = models.PositiveIntegerField(default=0, editable=False)
+    failed_count = models.PositiveIntegerField(default=0, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True, editable=False)
+    finished_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.subject
+
+
+class NewsletterDelivery(models.Model):
+    """Delivery state of one campaign to one subscriber, kept to three small columns."""
+    QUEUED, SENT, FAILED = 0, 1, 2
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+    campaign = models.ForeignKey(NewsletterCampaign, on_delete=models.CASCADE, related_name='deliveries')
+    subscriber = models.ForeignKey(Newsletter, on_delete=models.CASCADE, related_name='deliveries')
+    status = models.PositiveSmallIntegerField(choices=STATUS_CHOICES, default=QUEUED)
+
+    class Meta:
+        unique_together = ['campaign', 'subscriber']
+        verbose_name_plural = "Newsletter deliveries"
+
+    def __str__(self):
+        return f"{self.campaign} → {self.subscriber}"
@@ -1,3 +1,53 @@
-from django.test import TestCase
+from django.test import Client, TestCase, override_settings
 
-# Create your tests here.
+from sections.models import Metric
+
+from .models import Newsletter
+
+
+@override_settings(RATELIMIT_ENABLED=False)
+class CsrfTests(TestCase):
+    """Cached pages render no CSRF token; their forms fetch one and are still checked."""
+
+    def setUp(self):
+        self.client = Client(enforce_csrf_checks=True)
+
+    def subscribe(self, **headers):
+        return self.client.post('/en/', {'email': 'someone@example.com'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest', **headers)
+
+    def test_home_sets_no_csrf_cookie(self):
+        response = self.client.get('/en/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('csrftoken', response.cookies)
+
+    def test_newsletter_sign_up_needs_a_token(self):
+        self.assertEqual(self.subscribe().status_code, 403)
+
+        token = self.client.get('/csrf-token/').json()['token']
+        response = self.subscribe(HTTP_X_CSRFTOKEN=token)
+        self.assertEqual(response.json()['success'], True)
+
+    def test_set_language_needs_a_token(self):
+        self.assertEqual(self.client.post('/set-language/', {'language': 'hr', 'next': '/en/'}).status_code, 403)
+
+        token = self.client.get('/csrf-token/').json()['token']
+        response = self.client.post('/set-language/', {'language': 'hr', 'next': '/en/', 'csrfmiddlewaretoken': token})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.cookies['django_language'].value, 'hr')
+
+
+@override_settings(RATELIMIT_ENABLED=False)
+class NewsletterSignUpTests(TestCase):
+    def subscribe(self):
+        return self.client.post('/en/', {'email': 'someone@example.com'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+
+    def test_signing_up_again_after_unsubscribing_reactivates(self):
+        Newsletter.objects.create(email='someone@example.com', is_active=False)
+        Metric.objects.create(name='subscribers', value=0)
+
+        response = self.subscribe()
+        self.assertEqual(response.json()['success'], True)
+        self.assertEqual(Newsletter.objects.get().is_active, True)
+        self.assertEqual(Metric.objects.get(name='subscribers').value, 1)
+
+        self.assertEqual(self.subscribe().status_code, 400)
@@ -4,11 +4,19 @@ from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
 from django.http import JsonResponse
+from django.middleware.csrf import get_token
+from django.views.decorators.cache import never_cache
+from django.views.decorators.csrf import csrf_exempt
 from company.models import Employee, FAQ, Newsletter
+from company.broadcast import subscriber_id_from_token
 from sections.models import Header, Banner, Stat, Story, Principle
+from sections.metrics import add_to_metric
 from games.models import GameTitle, Instrument
 from events.models import GameSession
 from .forms import ContactForm, NewsletterForm
+from core.http import conditional_content
+from core.ratelimit import rate_limit
+from core.translations import prefetch_translations
 import threading
 
 def send_email_async(subject, message, from_email, recipient_list):
@@ -30,8 +38,15 @@ def send_email_async(subject, message, from_email, recipient_list):
     thread.daemon = True
     thread.start()
 
+@conditional_content('home')
+@rate_limit('newsletter', ip='10/10m', email='3/h')
 def home(request):
-    """Homepage with featured content and newsletter subscription"""
+    """
+    Homepage with featured content and newsletter subscription.
+
+    The page renders no CSRF token, so it sets no CSRF cookie and can be
+    micro-cached; the sign-up script fetches a token from csrf_token first.
+    """
     
     # Handle newsletter subscription via AJAX
     if request.method == 'POST':
@@ -56,13 +71,17 @@ def home(request):
                 }, status=400)
             
             try:
-                # Create subscription
-                subscription = Newsletter.objects.create(
-                    email=email,
-                    name=name
-                )
-                
-                print(f"✓ Newsletter subscription created: {subscription.email}")
+                # Someone who unsubscribed keeps their row (the email is
+                # unique), so signing up again reactivates it
+                if Newsletter.objects.filter(email=email, is_active=False).update(is_active=True):
+                    add_to_metric('subscribers', 1)
+                    print(f"✓ Newsletter subscription reactivated: {email}")
+                else:
+                    subscription = Newsletter.objects.create(
+                        email=email,
+                        name=name
+                    )
+                    print(f"✓ Newsletter subscription created: {subscription.email}")
                 
                 # Send confirmation email ASYNCHRONOUSLY (non-blocking)
                 # This won't delay the response even if email fails
@@ -91,30 +110,31 @@ def home(request):
     
     # Regular GET request - display homepage
     header = Header.objects.filter(page='home').first()
-    banners = Banner.objects.filter(page='home')
-    featured_games = GameTitle.objects.filter(is_featured=True)[:6]
-    upcoming_sessions = GameSession.objects.filter(
+    banners = prefetch_translations(Banner.objects.filter(page='home'))
+    featured_games = prefetch_translations(GameTitle.objects.filter(is_featured=True))[:6]
+    upcoming_sessions = prefetch_translations(GameSession.objects.filter(
         date__gte=timezone.now().date(),
         is_active=True
-    ).order_by('date', 'start_time')[:3]
+    )).order_by('date', 'start_time')[:3]
     
     context = {
         'header': header,
         'banners': banners,
         'featured_games': featured_games,
         'upcoming_sessions': upcoming_sessions,
-        'instruments': Instrument.objects.filter(is_available=True),
+        'instruments': prefetch_translations(Instrument.objects.filter(is_available=True)),
     }
     return render(request, 'company/home.html', context)
 
 
+@conditional_content('about')
 def about(request):
     """About page"""
     members = Employee.objects.all()
-    stats = Stat.objects.all()
-    stories = Story.objects.all()
-    principles = Principle.objects.all()
-    banners = Banner.objects.filter(page='about')
+    stats = prefetch_translations(Stat.objects.all())
+    stories = prefetch_translations(Story.objects.all())
+    principles = prefetch_translations(Principle.objects.all())
+    banners = prefetch_translations(Banner.objects.filter(page='about'))
     header = Header.objects.filter(page='about').first()
     context = {
         'team_members': members,
@@ -127,6 +147,8 @@ def about(request):
     return render(request, 'company/about.html', context)
 
 
+@conditional_content('contact')
+@rate_limit('contact', ip='5/10m', email='3/h')
 def contact(request):
     """Contact page with form"""
     if request.method == 'POST':
@@ -162,8 +184,39 @@ def contact(request):
     
     context = {
         'header': Header.objects.filter(page='contact').first(),
-        'banners': Banner.objects.filter(page='contact').all(),
-        'faqs': FAQ.objects.all()[:5],
+        'banners': prefetch_translations(Banner.objects.filter(page='contact')),
+        'faqs': prefetch_translations(FAQ.objects.all())[:5],
         'form': form,
     }
-    return render(request, 'company/contact.html', context)
\ No newline at end of file
+    return render(request, 'company/contact.html', context)
+
+
+@never_cache
+def csrf_token(request):
+    """
+    CSRF token for the forms of cached pages (newsletter sign-up, language
+    switcher), fetched by script when they are submitted.
+    """
+    return JsonResponse({'token': get_token(request)})
+
+
+@csrf_exempt
+def newsletter_unsubscribe(request, token):
+    """
+    Unsubscribe link from newsletter emails; no login needed, the signed
+    token is the proof. GET asks for confirmation (so link scanners don't
+    unsubscribe anyone), POST unsubscribes. CSRF-exempt because mail
+    clients POST here directly for one-click unsubscribe.
+    """
+    subscriber_id = subscriber_id_from_token(token)
+    subscriber = Newsletter.objects.filter(pk=subscriber_id).first() if subscriber_id else None
+    unsubscribed = False
+    if subscriber and request.method == 'POST':
+        if Newsletter.objects.filter(pk=subscriber.pk, is_active=True).update(is_active=False):
+            add_to_metric('subscribers', -1)
+        unsubscribed = True
+    elif subscriber:
+        unsubscribed = not subscriber.is_active
+
+    context = {'subscriber': subscriber, 'unsubscribed': unsubscribed}
+    return render(request, 'company/unsubscribe.html', context, status=200 if subscriber else 404)
@@ -0,0 +1,180 @@
+# core/admin.py
+"""
+Changelist pagination for large tables.
+
+    @admin.register(Booking)
+    class BookingAdmin(LargeTableAdminMixin, admin.ModelAdmin): ...
+
+The stock changelist runs an exact COUNT(*) of the filtered queryset on
+every page view and pages with OFFSET, both of which grow with the table.
+Here counts are exact up to a limit and estimated (or cached) above it,
+and the "next" link carries a keyset cursor so deep pages cost the same
+as the first one.
+"""
+import base64
+import hashlib
+import json
+
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import PAGE_VAR, ChangeList
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+CURSOR_VAR = 'after'
+
+# How long a count above the exact limit is reused on backends without
+# planner estimates
+ESTIMATE_TIMEOUT = 300
+
+
+def estimated_count(queryset):
+    """
+    Row count for a large queryset: the planner's estimate on PostgreSQL,
+    otherwise an exact count reused for ESTIMATE_TIMEOUT seconds.
+    """
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    sql, params = queryset.query.sql_with_params()
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    key = 'admin_count:' + hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, ESTIMATE_TIMEOUT)
+    return count
+
+
+class EstimatedCountPaginator(Paginator):
+    """Exact counts up to ``exact_count_limit`` rows, estimates above it."""
+
+    exact_count_limit = 10000
+    is_estimate = False
+
+    @cached_property
+    def count(self):
+        # Stops scanning after limit + 1 rows, whatever the table size
+        bounded = self.object_list.order_by().values('pk')[:self.exact_count_limit + 1].count()
+        if bounded <= self.exact_count_limit:
+            return bounded
+        self.is_estimate = True
+        return max(estimated_count(self.object_list), bounded)
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            # An estimate can undercount; let the page come back short instead
+            if self.is_estimate and int(number) > 1:
+                return int(number)
+            raise
+
+
+def _encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+
+
+class KeysetChangeList(ChangeList):
+    """
+    ChangeList whose "next page" link is a keyset cursor (?after=...) over
+    the current ordering, when that ordering is on non-null model fields.
+    Numbered page links keep working as before.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR) or None
+        self.next_page_url = None
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Filter and sort links start again from the first page
+        if not new_params or CURSOR_VAR not in new_params:
+            remove = [CURSOR_VAR, *(remove or [])]
+        return super().get_query_string(new_params, remove)
+
+    def keyset_fields(self):
+        """[(field, descending)] the queryset is ordered by, or None if keyset paging can't follow it."""
+        fields = []
+        for item in self.queryset.query.order_by:
+            if not isinstance(item, str) or '__' in item or item.startswith('?'):
+                return None
+            name = item.lstrip('-')
+            try:
+                field = self.opts.pk if name == 'pk' else self.opts.get_field(name)
+            except FieldDoesNotExist:
+                # Annotation
+                return None
+            if not field.concrete or field.is_relation or field.null:
+                return None
+            fields.append((field, item.startswith('-')))
+        return fields or None
+
+    def _cursor_filter(self, fields):
+        try:
+            raw = _decode_cursor(self.cursor)
+            if not isinstance(raw, list) or len(raw) != len(fields):
+                raise ValueError(self.cursor)
+            values = [field.to_python(value) for (field, _desc), value in zip(fields, raw)]
+        except (TypeError, ValueError, ValidationError):
+            raise IncorrectLookupParameters
+
+        condition, equal = Q(), Q()
+        for (field, descending), value in zip(fields, values):
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{field.attname}__{lookup}': value})
+            equal &= Q(**{field.attname: value})
+        return condition
+
+    def get_results(self, request):
+        fields = self.keyset_fields()
+        if self.cursor and fields:
+            paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+            self.result_count = paginator.count
+            self.show_full_result_count = self.model_admin.show_full_result_count
+            self.full_result_count = self.root_queryset.count() if self.show_full_result_count else None
+            self.show_admin_actions = not self.show_full_result_count or bool(self.full_result_count)
+            self.result_list = self.queryset.filter(self._cursor_filter(fields))[:self.list_per_page]
+            self.can_show_all = False
+            self.multi_page = True
+            self.paginator = paginator
+        else:
+            super().get_results(request)
+
+        if fields and self.multi_page and not (self.show_all and self.can_show_all):
+            # Evaluates the page once; the template reuses the result cache
+            rows = list(self.result_list)
+            if len(rows) == self.list_per_page:
+                last = rows[-1]
+                cursor = _encode_cursor([field.value_to_string(last) for field, _desc in fields])
+                self.next_page_url = self.get_query_string({CURSOR_VAR: cursor, PAGE_VAR: self.page_num + 1})
+
+
+class LargeTableAdminMixin:
+    """ModelAdmin mixin: estimated counts, keyset "next" links, no unfiltered total."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
@@ -0,0 +1,100 @@
+# core/cache.py
+"""
+Content-version tokens for template fragment caching.
+
+Each group names a set of models whose changes should invalidate the cached
+fragments of a page. Templates key their {% cache %} blocks on the group's
+token, so saving or deleting any of those models (or their parler
+translations) makes every old fragment unreachable without having to know
+its cache key. The same signals refresh the affected pages in the nginx
+micro-cache (core.purge).
+"""
+import time
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+from .purge import purge_content_groups
+
+CONTENT_VERSION_MODELS = {
+    # Rendered by base.html on every page (company context processor)
+    'base': ['company.CompanyInfo', 'company.ContactInfo'],
+    'sessions': [
+        'events.Event', 'events.TicketType', 'events.GameSession', 'events.Booking',
+        'sections.Header',
+    ],
+    'home': [
+        'events.GameSession', 'events.Booking', 'games.GameTitle', 'games.Instrument',
+        'sections.Header', 'sections.Banner',
+    ],
+    'about': [
+        'company.Employee', 'sections.Header', 'sections.Banner', 'sections.Stat',
+        'sections.Story', 'sections.Principle',
+    ],
+    'contact': ['sections.Header', 'sections.Banner', 'company.FAQ'],
+}
+
+
+def _cache_key(group):
+    return f'content_version:{group}'
+
+
+def content_version(group):
+    """Return the current token for a group, creating one if the cache lost it."""
+    key = _cache_key(group)
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.add(key, version, timeout=None)
+        version = cache.get(key, version)
+    return version
+
+
+def bump_content_version(*groups):
+    for group in groups:
+        cache.set(_cache_key(group), time.time_ns(), timeout=None)
+
+
+def cached_for_version(key, group, build, timeout=3600):
+    """Return build(), cached until the group's content version changes."""
+    versioned_key = f'{key}:{content_version(group)}'
+    value = cache.get(versioned_key)
+    if value is None:
+        value = build()
+        cache.set(versioned_key, value, timeout=timeout)
+    return value
+
+
+class ContentVersions:
+    """Template-friendly lookup: {{ content_versions.sessions }}"""
+
+    def __getitem__(self, group):
+        if group not in CONTENT_VERSION_MODELS:
+            raise KeyError(group)
+        return content_version(group)
+
+
+def _groups_by_model():
+    groups_by_model = {}
+    for group, labels in CONTENT_VERSION_MODELS.items():
+        for label in labels:
+            model = apps.get_model(label)
+            related = [model]
+            # Translated fields live in a separate parler model
+            if hasattr(model, '_parler_meta'):
+                related += list(model._parler_meta.get_all_models())
+            for m in related:
+                groups_by_model.setdefault(m, set()).add(group)
+    return groups_by_model
+
+
+def connect_content_version_signals():
+    for model, groups in _groups_by_model().items():
+        def handler(sender, _groups=tuple(sorted(groups)), **kwargs):
+            bump_content_version(*_groups)
+            purge_content_groups(*_groups)
+
+        uid = f'content_version:{model._meta.label}'
+        post_save.connect(handler, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(handler, sender=model, weak=False, dispatch_uid=uid)
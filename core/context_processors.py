@@ -0,0 +1,7 @@
+# core/context_processors.py
+from .cache import ContentVersions
+
+
+def content_versions(request):
+    """Lazy per-group content tokens used as {% cache %} keys."""
+    return {'content_versions': ContentVersions()}
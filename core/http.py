@@ -0,0 +1,110 @@
+# core/http.py
+"""
+HTTP validators for content pages.
+
+    @conditional_content('sessions')
+    def sessions_list(request): ...
+
+Last-Modified is the newest timestamp of the models behind the page's
+content-version groups (see core.cache), so a browser or nginx revalidating
+an unchanged page gets a 304 before the view touches the database.
+"""
+import datetime
+import hashlib
+from functools import wraps
+
+from django.apps import apps
+from django.contrib.messages import get_messages
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .cache import CONTENT_VERSION_MODELS, cached_for_version, content_version
+
+TIMESTAMP_FIELDS = ('updated_at', 'created_at')
+
+
+def _version_as_datetime(version):
+    return datetime.datetime.fromtimestamp(version / 1e9, tz=datetime.timezone.utc)
+
+
+def _group_last_modified(group, version):
+    latest = [_version_as_datetime(version)]
+    for label in CONTENT_VERSION_MODELS[group]:
+        model = apps.get_model(label)
+        field_names = {f.name for f in model._meta.get_fields()}
+        field = next((f for f in TIMESTAMP_FIELDS if f in field_names), None)
+        if field is None:
+            # No timestamp column; the version token's bump time covers it
+            continue
+        value = model.objects.aggregate(latest=Max(field))['latest']
+        if value:
+            latest.append(value)
+    return max(latest)
+
+
+def content_last_modified(*groups):
+    """Newest change across the given groups, never earlier than local midnight."""
+    latest = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    for group in groups:
+        # Kept in the shared cache next to the token it was computed for, so
+        # a change made through any worker is seen by all of them
+        version = content_version(group)
+        group_latest = cached_for_version(
+            f'last_modified:{group}', group, lambda: _group_last_modified(group, version), timeout=None,
+        )
+        latest = max(latest, group_latest)
+    return latest
+
+
+def _content_etag(request, groups, last_modified):
+    parts = [getattr(request, 'LANGUAGE_CODE', ''), str(int(last_modified.timestamp()))]
+    parts += [str(content_version(group)) for group in groups]
+    return '"%s"' % hashlib.md5(':'.join(parts).encode()).hexdigest()
+
+
+def _has_private_state(request):
+    """Flash messages or a logged-in user make the page specific to this visitor."""
+    if len(get_messages(request)):
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_authenticated)
+
+
+def conditional_content(*groups, max_age=0):
+    """
+    Answer conditional GETs with 304 when none of the page's content groups
+    changed, and mark anonymous responses cacheable by shared caches.
+    Every page extends base.html, so the 'base' group is always included.
+    """
+    groups = ('base',) + tuple(g for g in groups if g != 'base')
+
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or _has_private_state(request):
+                response = view(request, *args, **kwargs)
+                if request.method in ('GET', 'HEAD'):
+                    patch_cache_control(response, private=True, no_cache=True)
+                return response
+
+            last_modified = content_last_modified(*groups)
+            etag = _content_etag(request, groups, last_modified)
+            timestamp = int(last_modified.timestamp())
+
+            response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = view(request, *args, **kwargs)
+
+            if response.status_code in (200, 304):
+                response.headers.setdefault('ETag', etag)
+                if not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(timestamp)
+                patch_cache_control(response, public=True, max_age=max_age)
+            patch_vary_headers(response, ('Accept-Language', 'Cookie'))
+            return response
+
+        return inner
+
+    return decorator
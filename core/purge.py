@@ -0,0 +1,90 @@
+# core/purge.py
+"""
+Refreshes nginx micro-cache entries (nginx-microcache.conf) after content
+changes, so visitors see new bookings and edits without waiting for the
+entry to expire. Disabled unless NGINX_CACHE_REFRESH_URL is set.
+
+Committed changes queue their pages; one background thread per process
+refreshes everything queued within COALESCE_SECONDS once, so a burst of
+bookings costs each affected page one request rather than one per booking.
+"""
+import threading
+import time
+import urllib.request
+
+from django.conf import settings
+from django.db import transaction
+from django.urls import NoReverseMatch, reverse
+from django.utils import translation
+
+# Content-version group -> URL names whose cached pages show that content
+CACHED_URL_NAMES = {
+    'base': ['home', 'about', 'contact', 'sessions_list'],
+    'home': ['home'],
+    'about': ['about'],
+    'contact': ['contact'],
+    'sessions': ['sessions_list'],
+}
+
+# Changes committed this close together share one refresh
+COALESCE_SECONDS = 1
+
+_pending = set()
+_pending_lock = threading.Lock()
+_wake = threading.Event()
+_worker = None
+
+
+def urls_for_groups(*groups):
+    names = {name for group in groups for name in CACHED_URL_NAMES.get(group, [])}
+    paths = set()
+    for lang_code, _name in settings.LANGUAGES:
+        with translation.override(lang_code):
+            for name in names:
+                try:
+                    paths.add(reverse(name))
+                except NoReverseMatch:
+                    continue
+    return sorted(paths)
+
+
+def _refresh(paths):
+    base_url = settings.NGINX_CACHE_REFRESH_URL.rstrip('/')
+    for path in paths:
+        try:
+            urllib.request.urlopen(base_url + path, timeout=5).close()
+        except Exception as e:
+            print(f"✗ Cache refresh failed for {path}: {e}")
+
+
+def _run():
+    while True:
+        _wake.wait()
+        time.sleep(COALESCE_SECONDS)
+        with _pending_lock:
+            paths = sorted(_pending)
+            _pending.clear()
+            _wake.clear()
+        _refresh(paths)
+
+
+def _queue(paths):
+    global _worker
+    with _pending_lock:
+        _pending.update(paths)
+        _wake.set()
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name='nginx-cache-refresh', daemon=True)
+            _worker.start()
+
+
+def purge_urls(paths):
+    """Queue the given paths for a refresh once the transaction commits."""
+    if not settings.NGINX_CACHE_REFRESH_URL or not paths:
+        return
+    paths = list(paths)
+    transaction.on_commit(lambda: _queue(paths))
+
+
+def purge_content_groups(*groups):
+    purge_urls(urls_for_groups(*groups))
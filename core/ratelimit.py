@@ -0,0 +1,154 @@
+# core/ratelimit.py
+"""
+Sliding-window rate limits for public POST endpoints.
+
+    @rate_limit('contact', ip='5/10m', email='3/h')
+    def contact(request): ...
+
+Each limit keeps one counter per fixed window in the 'ratelimit' cache
+(settings.CACHES). The sliding count is the current window's counter plus
+the previous window's, weighted by how much of it still overlaps the last
+`window` seconds - two integers per key instead of a timestamp log, and
+one get_many() plus one add() or incr() per limit. The decision is made
+on the count incr() returns, so of many requests arriving together only
+as many as the limit allows get through; a rejected request is taken
+back out with decr(), so a flood doesn't extend its own wait.
+
+The counters have to live in a cache every gunicorn worker shares for the
+limits to hold across workers. The default is the file-based cache under
+the project directory; its incr() is a read and a write, so a burst
+racing across workers can overshoot by a request or two. Redis or
+Memcached count exactly.
+"""
+import hashlib
+import re
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.shortcuts import redirect
+
+RATE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+_RATE_RE = re.compile(r'^(\d+)/(\d*)([smhd])$')
+
+LIMITED_MESSAGE = 'Too many attempts. Please wait a few minutes and try again.'
+
+
+def parse_rate(rate):
+    """'5/10m' -> (5, 600): at most 5 requests in any 10 minutes."""
+    match = _RATE_RE.match(rate.replace(' ', ''))
+    if not match:
+        raise ValueError(f"Invalid rate {rate!r}; expected e.g. '5/m', '20/h' or '5/10m'")
+    count, multiplier, unit = match.groups()
+    return int(count), int(multiplier or 1) * RATE_UNITS[unit]
+
+
+def client_ip(request):
+    # nginx passes the peer address as X-Real-IP; gunicorn itself only
+    # listens on a local socket, so the header can't be forged from outside
+    return request.META.get('HTTP_X_REAL_IP') or request.META.get('REMOTE_ADDR', '')
+
+
+def _window_keys(scope, kind, value, window, now):
+    digest = hashlib.md5(value.encode()).hexdigest()
+    index = int(now // window)
+    base = f'rl:{scope}:{kind}:{digest}:{window}'
+    return f'{base}:{index}', f'{base}:{index - 1}'
+
+
+def _increment(cache, key, timeout):
+    """Add one to a window counter; returns the new count."""
+    if cache.add(key, 1, timeout=timeout):
+        return 1
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.set(key, 1, timeout=timeout)
+        return 1
+
+
+def hit(scope, limits, now=None):
+    """
+    Count one request against every (kind, value, rate) in limits; if that
+    takes any of them over its rate, the request is not counted after all.
+
+    Returns 0 if allowed, otherwise the seconds to wait before retrying.
+    """
+    cache = caches['ratelimit']
+    now = now or time.time()
+    checks = []
+    for kind, value, rate in limits:
+        count, window = parse_rate(rate)
+        current, previous = _window_keys(scope, kind, value, window, now)
+        checks.append((count, window, current, previous))
+
+    previous_counts = cache.get_many([check[3] for check in checks])
+    counted = []
+    retry_after = 0
+    for count, window, current, previous in checks:
+        # The counter outlives its own window so it can act as "previous"
+        used = _increment(cache, current, timeout=window * 2)
+        counted.append(current)
+        overlap = 1 - (now % window) / window
+        if used + previous_counts.get(previous, 0) * overlap > count:
+            retry_after = max(1, int(window - now % window))
+            break
+
+    if retry_after:
+        for key in counted:
+            try:
+                cache.decr(key)
+            except ValueError:
+                # Expired meanwhile
+                pass
+    return retry_after
+
+
+def limited_response(request, retry_after):
+    """429 JSON for AJAX callers; otherwise a flash message and back to the page."""
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        response = JsonResponse({'success': False, 'errors': {'__all__': [LIMITED_MESSAGE]}}, status=429)
+    else:
+        messages.error(request, LIMITED_MESSAGE)
+        response = redirect(request.get_full_path())
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def rate_limit(scope, ip=None, email=None, email_field='email', methods=('POST',)):
+    """
+    Limit a view per client IP and/or per submitted email address.
+
+    scope       -- counter namespace, one per endpoint
+    ip, email   -- rates like '5/10m'; None to skip that key
+    email_field -- POST field holding the email address
+    """
+    for rate in (ip, email):
+        if rate:
+            parse_rate(rate)
+
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method not in methods or not getattr(settings, 'RATELIMIT_ENABLED', True):
+                return view(request, *args, **kwargs)
+
+            limits = []
+            if ip:
+                limits.append(('ip', client_ip(request), ip))
+            address = request.POST.get(email_field, '').strip().lower() if email else ''
+            if address:
+                limits.append(('email', address, email))
+
+            retry_after = hit(scope, limits) if limits else 0
+            if retry_after:
+                return limited_response(request, retry_after)
+            return view(request, *args, **kwargs)
+
+        return inner
+
+    return decorator
@@ -0,0 +1,93 @@
+import threading
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from . import purge
+from .ratelimit import LIMITED_MESSAGE, hit
+
+RATELIMIT_CACHES = {
+    **settings.CACHES,
+    'ratelimit': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'ratelimit-tests'},
+}
+
+
+@override_settings(CACHES=RATELIMIT_CACHES)
+class HitTests(SimpleTestCase):
+    def setUp(self):
+        caches['ratelimit'].clear()
+
+    def test_rejected_requests_are_not_counted(self):
+        limits = [('ip', '10.0.0.1', '3/m')]
+        self.assertEqual([hit('test', limits, now=60) for _request in range(8)], [0, 0, 0] + [60] * 5)
+        # Half way through the next window, half of the three still count
+        self.assertEqual([hit('test', limits, now=150) for _request in range(2)], [0, 30])
+
+    def test_a_burst_lets_exactly_the_limit_through(self):
+        requests = 20
+        start = threading.Barrier(requests)
+        results = []
+
+        get_many = LocMemCache.get_many
+
+        def slow_get_many(cache, *args, **kwargs):
+            # Let every request read the counters before any of them counts
+            values = get_many(cache, *args, **kwargs)
+            time.sleep(0.05)
+            return values
+
+        def request():
+            start.wait()
+            results.append(hit('test', [('ip', '10.0.0.1', '5/m')], now=60))
+
+        threads = [threading.Thread(target=request) for _request in range(requests)]
+        with mock.patch.object(LocMemCache, 'get_many', slow_get_many):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(results.count(0), 5)
+
+
+@override_settings(CACHES=RATELIMIT_CACHES, RATELIMIT_ENABLED=True)
+class RateLimitedViewTests(TestCase):
+    # The contact form allows 3 messages an hour per email address
+    def setUp(self):
+        caches['ratelimit'].clear()
+
+    def post(self, **headers):
+        return self.client.post('/en/contact/', {'email': 'someone@example.com'}, **headers)
+
+    def test_ajax_gets_429(self):
+        for _attempt in range(3):
+            self.assertEqual(self.post(HTTP_X_REQUESTED_WITH='XMLHttpRequest').status_code, 200)
+        response = self.post(HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json()['errors']['__all__'], [LIMITED_MESSAGE])
+        self.assertGreater(int(response['Retry-After']), 0)
+
+    def test_form_post_is_sent_back_with_a_message(self):
+        for _attempt in range(3):
+            self.assertEqual(self.post().status_code, 200)
+        response = self.post()
+        self.assertRedirects(response, '/en/contact/', fetch_redirect_response=False)
+        self.assertIn('Retry-After', response)
+        self.assertEqual([str(message) for message in get_messages(response.wsgi_request)], [LIMITED_MESSAGE])
+
+
+@override_settings(NGINX_CACHE_REFRESH_URL='http://127.0.0.1:8081')
+class PurgeTests(TestCase):
+    @mock.patch.object(purge, 'COALESCE_SECONDS', 0.2)
+    def test_changes_close_together_share_one_refresh(self):
+        refreshed = threading.Event()
+        with mock.patch.object(purge, '_refresh', side_effect=lambda paths: refreshed.set()) as refresh:
+            for groups in (['sessions'], ['sessions', 'home'], ['about']):
+                with self.captureOnCommitCallbacks(execute=True):
+                    purge.purge_content_groups(*groups)
+            self.assertTrue(refreshed.wait(5))
+        refresh.assert_called_once_with(['/en/', '/en/about/', '/en/sessions/', '/hr/', '/hr/about/', '/hr/sessions/'])
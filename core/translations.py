@@ -0,0 +1,41 @@
+# core/translations.py
+"""
+Bulk translation loading for parler models in list views.
+
+    banners = prefetch_translations(Banner.objects.filter(page='home'))
+
+Without it every object in a list fetches its own translation row (and
+safe_translation_getter(..., any_language=True) may fetch another). With
+it, the whole result set gets its translations in one extra query. The
+rows land in Django's prefetch cache, which parler reads before its own
+cache or the database, so missing languages are also resolved without
+queries. Stays lazy, so it composes with {% cache %} fragments.
+"""
+from django.db.models import Prefetch
+from django.utils.translation import get_language
+from parler import appsettings
+
+
+def translations_prefetch(model, language_code=None, any_language=False, via=None):
+    """
+    Prefetch object for a parler model's translations in the active
+    language and its fallbacks, or in every language with ``any_language``
+    (for lists rendered through __str__, e.g. admin changelists).
+
+    ``via`` prefetches through a relation instead, e.g.
+    translations_prefetch(GameSession, via='session') on a Booking queryset.
+    """
+    meta = model._parler_meta.root
+    queryset = meta.model.objects.all()
+    if not any_language:
+        languages = appsettings.PARLER_LANGUAGES.get_active_choices(language_code or get_language())
+        queryset = queryset.filter(language_code__in=languages)
+    lookup = f"{via}__{meta.rel_name}" if via else meta.rel_name
+    return Prefetch(lookup, queryset=queryset)
+
+
+def prefetch_translations(queryset, language_code=None, any_language=False):
+    """Add a translations prefetch to ``queryset``; see translations_prefetch()."""
+    return queryset.prefetch_related(
+        translations_prefetch(queryset.model, language_code=language_code, any_language=any_language)
+    )
@@ -1,6 +1,183 @@
+import calendar
+import logging
+from datetime import datetime
+from django import forms
 from django.contrib import admin
+from django.contrib.admin import helpers
+from django.core.exceptions import PermissionDenied
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Greatest
+from django.http import Http404
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from django.utils.dateformat import format as format_date
+from django.utils.text import slugify
 from parler.admin import TranslatableAdmin
-from .models import Event, TicketType, GameSession, Booking
+from core.admin import LargeTableAdminMixin
+from core.cache import cached_for_version
+from core.translations import prefetch_translations, translations_prefetch
+from .cancellations import cancel_sessions
+from .exports import booking_rows, bookings_for_export, export_response
+from .models import Event, TicketType, GameSession, Booking, BookingRollup
+from .rollups import REPORTS, TOTALS, daily_report, report_rows, session_report, ticket_type_report
+from .services import with_availability
+
+logger = logging.getLogger(__name__)
+
+# ── Export actions ────────────────────────────────────────────────────────────
+
+def _export_bookings(bookings, export_format, name):
+    filename = f"{slugify(name)}-{timezone.localdate():%Y%m%d}"
+    return export_response(booking_rows(bookings_for_export(bookings)), export_format, filename)
+
+
+@admin.action(description='Export selected bookings (CSV)')
+def export_bookings_csv(modeladmin, request, queryset):
+    return _export_bookings(queryset, 'csv', 'bookings')
+
+
+@admin.action(description='Export selected bookings (XLSX)')
+def export_bookings_xlsx(modeladmin, request, queryset):
+    return _export_bookings(queryset, 'xlsx', 'bookings')
+
+
+def _export_event_manifest(events, export_format):
+    bookings = Booking.objects.filter(session__event__in=events)
+    name = events[0].name if len(events) == 1 else 'events'
+    return _export_bookings(bookings, export_format, f"{name}-bookings")
+
+
+@admin.action(description='Export attendee manifest (CSV)')
+def export_event_bookings_csv(modeladmin, request, queryset):
+    return _export_event_manifest(list(queryset), 'csv')
+
+
+@admin.action(description='Export attendee manifest (XLSX)')
+def export_event_bookings_xlsx(modeladmin, request, queryset):
+    return _export_event_manifest(list(queryset), 'xlsx')
+
+
+# ── Session cancellation ──────────────────────────────────────────────────────
+
+def _confirm_cancellation(modeladmin, request, queryset, sessions):
+    """The action's confirmation page: what will be cancelled and refunded."""
+    open_bookings = ~Q(bookings__status='cancelled')
+    card_paid = (
+        open_bookings & Q(bookings__payment_status='completed')
+        & ~Q(bookings__stripe_payment_intent_id='') & ~Q(bookings__payment_method='paypal')
+    )
+    sessions = list(prefetch_translations(
+        sessions.annotate(
+            open_bookings=Count('bookings', filter=open_bookings),
+            card_bookings=Count('bookings', filter=card_paid),
+            card_total=Sum('bookings__total_price', filter=card_paid),
+        ).order_by('date', 'start_time'),
+        any_language=True,
+    ))
+    context = {
+        **modeladmin.admin_site.each_context(request),
+        'title': 'Cancel sessions and refund bookings',
+        'opts': modeladmin.model._meta,
+        'queryset': queryset,
+        'sessions': sessions,
+        'totals': {
+            'bookings': sum(session.open_bookings for session in sessions),
+            'refund': sum(session.card_total or 0 for session in sessions),
+        },
+        'action': request.POST.get('action'),
+        'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+    }
+    return TemplateResponse(request, 'admin/events/cancel_sessions.html', context)
+
+
+def _cancel_and_refund(modeladmin, request, queryset, sessions):
+    if not request.POST.get('post'):
+        return _confirm_cancellation(modeladmin, request, queryset, sessions)
+
+    session_ids = list(sessions.values_list('pk', flat=True))
+    cancelled, refunded, manual, failed = cancel_sessions(
+        GameSession.objects.filter(pk__in=session_ids), log=logger.info,
+    )
+    modeladmin.message_user(
+        request,
+        f"Cancelled {cancelled} bookings on {len(session_ids)} sessions, {refunded} refunded by card. "
+        f"Customers will be emailed by send_cancellation_notices.",
+    )
+    if manual:
+        modeladmin.message_user(
+            request, f"Refund these by hand (not paid by card): {', '.join(manual)}", level='warning',
+        )
+    if failed:
+        references = Booking.objects.filter(session_id__in=session_ids).exclude(
+            status='cancelled',
+        ).values_list('booking_reference', flat=True)
+        modeladmin.message_user(
+            request,
+            f"{failed} bookings could not be refunded yet and are still open: {', '.join(references)}. "
+            f"Run the action again to retry them.",
+            level='error',
+        )
+    return None
+
+
+@admin.action(description='Cancel sessions and refund bookings', permissions=['change'])
+def cancel_and_refund_sessions(modeladmin, request, queryset):
+    # The changelist queryset is annotated; select the sessions by id
+    session_ids = list(queryset.values_list('pk', flat=True))
+    return _cancel_and_refund(modeladmin, request, queryset, GameSession.objects.filter(pk__in=session_ids))
+
+
+@admin.action(description='Cancel upcoming sessions and refund bookings', permissions=['change'])
+def cancel_and_refund_event_sessions(modeladmin, request, queryset):
+    sessions = GameSession.objects.filter(event__in=queryset, date__gte=timezone.localdate())
+    return _cancel_and_refund(modeladmin, request, queryset, sessions)
+
+
+# ── List filters ──────────────────────────────────────────────────────────────
+
+class TicketTypeListFilter(admin.RelatedFieldListFilter):
+    """Ticket type choices with their events joined, cached until sessions content changes."""
+
+    def field_choices(self, field, request, model_admin):
+        def build():
+            ticket_types = TicketType.objects.select_related('event').order_by('event__name', 'order', 'price')
+            return [(tt.pk, str(tt)) for tt in ticket_types]
+        return cached_for_version('admin_choices:ticket_types', 'sessions', build)
+
+
+class SessionDateListFilter(admin.SimpleListFilter):
+    """
+    Session date by month, from the (small) sessions table rather than a
+    DISTINCT over bookings, cached until sessions content changes.
+    """
+    title = 'session date'
+    parameter_name = 'session_month'
+
+    def lookups(self, request, model_admin):
+        def build():
+            months = GameSession.objects.dates('date', 'month', order='DESC')
+            return [(f"{month:%Y-%m}", format_date(month, 'F Y')) for month in months]
+        return [
+            ('today', 'Today'),
+            ('upcoming', 'Upcoming'),
+        ] + cached_for_version('admin_choices:session_months', 'sessions', build)
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return queryset
+        today = timezone.localdate()
+        if value == 'today':
+            return queryset.filter(session__date=today)
+        if value == 'upcoming':
+            return queryset.filter(session__date__gte=today)
+        try:
+            first_day = datetime.strptime(value, '%Y-%m').date()
+        except ValueError:
+            return queryset.none()
+        last_day = first_day.replace(day=calendar.monthrange(first_day.year, first_day.month)[1])
+        return queryset.filter(session__date__range=(first_day, last_day))
 
 
 # ── TicketType inline (shown inside Event) ────────────────────────────────────
@@ -8,7 +185,7 @@ from .models import Event, TicketType, GameSession, Booking
 class TicketTypeInline(admin.TabularInline):
     model = TicketType
     extra = 1
-    fields = ['name', 'description', 'price', 'participant_count', 'order', 'is_active']
+    fields = ['name', 'description', 'price', 'participant_count', 'per_session_limit', 'order', 'is_active']
     ordering = ['order', 'price']
 
 
@@ -20,24 +197,34 @@ class EventAdmin(admin.ModelAdmin):
     list_filter   = ['is_active']
     search_fields = ['name', 'description']
     inlines       = [TicketTypeInline]
+    actions       = [export_event_bookings_csv, export_event_bookings_xlsx, cancel_and_refund_event_sessions]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            num_sessions=Count('sessions', distinct=True),
+            num_ticket_types=Count('ticket_types', distinct=True),
+        )
 
     def session_count(self, obj):
-        return obj.sessions.count()
+        return obj.num_sessions
     session_count.short_description = 'Sessions'
+    session_count.admin_order_field = 'num_sessions'
 
     def ticket_type_count(self, obj):
-        return obj.ticket_types.count()
+        return obj.num_ticket_types
     ticket_type_count.short_description = 'Ticket Types'
+    ticket_type_count.admin_order_field = 'num_ticket_types'
 
 
 # ── TicketType (standalone, for quick edits) ──────────────────────────────────
 
 @admin.register(TicketType)
 class TicketTypeAdmin(admin.ModelAdmin):
-    list_display  = ['name', 'event', 'price', 'participant_count', 'order', 'is_active']
+    list_display  = ['name', 'event', 'price', 'participant_count', 'per_session_limit', 'order', 'is_active']
     list_filter   = ['event', 'is_active']
     search_fields = ['name', 'event__name']
     ordering      = ['event', 'order', 'price']
+    list_select_related = ['event']
 
 
 # ── GameSession ───────────────────────────────────────────────────────────────
@@ -49,22 +236,39 @@ class GameSessionAdmin(TranslatableAdmin):
     list_filter   = ['date', 'collab', 'is_active', 'event']
     search_fields = ['translations__name', 'translations__description']
     date_hierarchy = 'date'
+    list_select_related = ['event']
+    actions       = [cancel_and_refund_sessions]
+
+    def get_queryset(self, request):
+        queryset = with_availability(prefetch_translations(super().get_queryset(request), any_language=True))
+        # GameSession.available_spots, for sorting by it
+        return queryset.annotate(spots_left=Greatest(F('max_participants') - F('booked_participants'), Value(0)))
 
     def available_spots(self, obj):
         return obj.available_spots
     available_spots.short_description = 'Available Spots'
+    available_spots.admin_order_field = 'spots_left'
 
 
 # ── Booking ───────────────────────────────────────────────────────────────────
 
 @admin.register(Booking)
-class BookingAdmin(admin.ModelAdmin):
+class BookingAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display  = ['customer_name', 'session', 'ticket_type', 'ticket_quantity',
                      'participants', 'total_price', 'booking_reference',
                      'payment_status', 'status', 'created_at']
-    list_filter   = ['status', 'payment_status', 'session__date', 'ticket_type', 'created_at']
+    list_filter   = ['status', 'payment_status', SessionDateListFilter,
+                     ('ticket_type', TicketTypeListFilter), 'created_at']
     search_fields = ['customer_name', 'customer_email', 'booking_reference']
-    readonly_fields = ['booking_reference', 'total_price', 'participants', 'access_token']
+    readonly_fields = ['booking_reference', 'total_price', 'participants', 'access_token', 'checked_in_by',
+                       'stripe_intent_status', 'stripe_intent_synced_at']
+    actions       = [export_bookings_csv, export_bookings_xlsx]
+    list_select_related = ['session', 'ticket_type__event']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            translations_prefetch(GameSession, any_language=True, via='session')
+        )
 
     fieldsets = [
         ('Customer', {
@@ -79,6 +283,77 @@ class BookingAdmin(admin.ModelAdmin):
         }),
         ('Status', {
             'fields': ['status', 'is_confirmed', 'payment_status',
-                       'payment_method', 'stripe_payment_intent_id', 'payment_completed_at'],
+                       'payment_method', 'stripe_payment_intent_id', 'stripe_intent_status',
+                       'stripe_intent_synced_at', 'payment_completed_at'],
+        }),
+        ('Check-in', {
+            'fields': ['checked_in_at', 'checked_in_by'],
         }),
-    ]
\ No newline at end of file
+    ]
+
+# ── Booking reports ───────────────────────────────────────────────────────────
+
+class BookingReportFilterForm(forms.Form):
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    event = forms.ModelChoiceField(Event.objects.all(), required=False)
+
+    def filters(self):
+        """Keyword arguments for the events.rollups reports; this year unless chosen otherwise."""
+        today = timezone.localdate()
+        data = self.cleaned_data if self.is_valid() else {}
+        event = data.get('event')
+        return {
+            'date_from': data.get('date_from') or today.replace(month=1, day=1),
+            'date_to': data.get('date_to') or today.replace(month=12, day=31),
+            'event_id': event.pk if event else None,
+        }
+
+
+@admin.register(BookingRollup)
+class BookingRollupAdmin(admin.ModelAdmin):
+    """Read-only reports over the rollups (events.rollups) instead of a change list."""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path('<str:report>.csv', self.admin_site.admin_view(self.export_view), name='%s_%s_export' % info),
+        ] + super().get_urls()
+
+    def changelist_view(self, request, extra_context=None):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        form = BookingReportFilterForm(request.GET or None)
+        filters = form.filters()
+        sessions = session_report(**filters)
+        context = {
+            **self.admin_site.each_context(request),
+            'title': 'Booking reports',
+            'opts': self.model._meta,
+            'form': form,
+            'filters': filters,
+            'query': request.GET.urlencode(),
+            'sessions': sessions,
+            'ticket_types': ticket_type_report(**filters),
+            'days': daily_report(**filters),
+            'totals': {total: sum(row[total] for row in sessions) for total in TOTALS},
+        }
+        return TemplateResponse(request, 'admin/events/booking_report.html', context)
+
+    def export_view(self, request, report):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        if report not in REPORTS:
+            raise Http404(f"No report {report}")
+        filters = BookingReportFilterForm(request.GET or None).filters()
+        filename = f"{report.replace('_', '-')}-{filters['date_from']:%Y%m%d}-{filters['date_to']:%Y%m%d}"
+        return export_response(report_rows(report, **filters), 'csv', filename)
@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class EventsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "events"
+
+    def ready(self):
+        from . import inventory, rollups
+        from .models import Booking, GameSession
+        from .states import booking_transitioned, refresh_cached_pages
+        booking_transitioned.connect(refresh_cached_pages, dispatch_uid='events.refresh_cached_pages')
+        booking_transitioned.connect(rollups.booking_transitioned, dispatch_uid='events.rollups.transitioned')
+        post_save.connect(rollups.booking_saved, sender=Booking, dispatch_uid='events.rollups.saved')
+        post_delete.connect(rollups.booking_deleted, sender=Booking, dispatch_uid='events.rollups.deleted')
+        post_save.connect(rollups.session_saved, sender=GameSession, dispatch_uid='events.rollups.session_saved')
+        booking_transitioned.connect(inventory.booking_transitioned, dispatch_uid='events.inventory.transitioned')
+        post_save.connect(inventory.booking_saved, sender=Booking, dispatch_uid='events.inventory.saved')
+        post_delete.connect(inventory.booking_deleted, sender=Booking, dispatch_uid='events.inventory.deleted')
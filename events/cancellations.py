@@ -0,0 +1,180 @@
+"""
+Cancelling whole sessions, e.g. when a venue falls through.
+
+    cancel_sessions(GameSession.objects.filter(event=event, date__gte=today))
+    send_cancellation_notices()
+
+The sessions are closed to new bookings first. Their bookings are then
+settled in batches: paid card bookings are refunded in full and unpaid
+intents cancelled, in parallel on a small thread pool (network calls only -
+the threads don't touch the database), and each batch is written back with
+two conditional UPDATEs (events.states). Every refund carries an
+idempotency key derived from the booking, so running the cancellation
+again after an interruption - or twice at once - finishes the job without
+refunding anyone twice (as long as the rerun is within Stripe's 24-hour
+idempotency window).
+
+Bookings paid some other way (PayPal, or at the door) are cancelled and
+reported for a manual refund; free ones are just cancelled. A booking
+whose refund fails is left as it is for the next run.
+
+Every booking cancelled here is stamped cancelled_at, which queues its
+notice; send_cancellation_notices() (cron) claims and mails them like the
+session reminders.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from core.cache import bump_content_version
+from core.purge import purge_content_groups
+from core.translations import translations_prefetch
+from .models import Booking, GameSession
+from .payments import PaymentError, get_provider
+from .reaper import CANCEL, PAID, _cancel_intent
+from .reminders import send_booking_emails
+from .states import transition_queryset
+
+# Outcomes of settling one booking
+REFUNDED = 'refunded'
+CANCELLED = 'cancelled'
+MANUAL = 'manual'
+FAILED = 'failed'
+
+
+def refund_idempotency_key(booking_id):
+    return f'refund-booking-{booking_id}'
+
+
+def _settle(booking):
+    """(outcome, refund id or error) for one booking; runs on the pool."""
+    pk, payment_status, payment_method, intent_id, total_price = booking
+    if not total_price:
+        # Free: nothing was paid, so there is nothing to refund
+        return CANCELLED, ''
+    if payment_status != 'completed':
+        outcome = _cancel_intent(intent_id)
+        if outcome == CANCEL:
+            return CANCELLED, ''
+        if outcome != PAID:
+            return FAILED, 'payment in progress or Stripe unreachable'
+        # Paid, but the webhook hasn't arrived yet: refund it like the rest
+    elif not intent_id or payment_method == 'paypal':
+        return MANUAL, ''
+
+    try:
+        refund = get_provider('stripe').refund(intent_id, idempotency_key=refund_idempotency_key(pk))
+    except PaymentError as e:
+        return FAILED, str(e)
+    return REFUNDED, refund['id']
+
+
+def cancel_sessions(sessions, batch_size=100, workers=8, log=print):
+    """
+    Close sessions and cancel (refunding where paid) their bookings.
+
+    Returns (cancelled, refunded, manual, failed) for this run: counts of
+    bookings, except manual, the references of the bookings it cancelled
+    that were paid some other way and need refunding by hand.
+    """
+    session_ids = list(sessions.values_list('pk', flat=True))
+    GameSession.objects.filter(pk__in=session_ids).update(is_active=False)
+
+    stripe_enabled = get_provider('stripe').enabled
+    queryset = (
+        Booking.objects
+        .filter(session_id__in=session_ids)
+        .exclude(status='cancelled')
+        .only('pk', 'booking_reference', 'payment_status', 'payment_method', 'stripe_payment_intent_id', 'total_price')
+        .order_by('pk')
+    )
+    cancelled = refunded = failed = 0
+    manual = []
+    last_pk = 0
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                bookings = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+                if not bookings:
+                    break
+                last_pk = bookings[-1].pk
+
+                work = [
+                    (b.pk, b.payment_status, b.payment_method,
+                     b.stripe_payment_intent_id if stripe_enabled else '', b.total_price)
+                    for b in bookings
+                ]
+                refunds, others, intents_cancelled, refund_by_hand = {}, [], [], []
+                for booking, (outcome, detail) in zip(bookings, pool.map(_settle, work)):
+                    if outcome == FAILED:
+                        failed += 1
+                        log(f"✗ {booking.booking_reference}: {detail}")
+                    elif outcome == REFUNDED:
+                        refunds[booking.pk] = detail
+                    else:
+                        others.append(booking.pk)
+                        if outcome == MANUAL:
+                            refund_by_hand.append(booking.pk)
+                        elif booking.stripe_payment_intent_id:
+                            intents_cancelled.append(booking.pk)
+
+                now = timezone.now()
+                if refunds:
+                    updated, _bookings = transition_queryset(
+                        Booking.objects.filter(pk__in=refunds), 'refund',
+                        refund_id=Case(*[When(pk=pk, then=Value(refund_id)) for pk, refund_id in refunds.items()]),
+                        cancelled_at=now,
+                    )
+                    refunded += updated
+                    cancelled += updated
+                if others:
+                    updated, changed = transition_queryset(
+                        Booking.objects.filter(pk__in=others), 'cancel',
+                        stripe_intent_status=Case(
+                            When(pk__in=intents_cancelled, then=Value('canceled')),
+                            default=F('stripe_intent_status'),
+                        ),
+                        cancelled_at=now,
+                    )
+                    cancelled += updated
+                    if refund_by_hand:
+                        # Only those this run cancelled, not ones settled meanwhile
+                        for reference, payment_method in changed.filter(pk__in=refund_by_hand).values_list(
+                            'booking_reference', 'payment_method',
+                        ):
+                            manual.append(reference)
+                            log(f"  {reference}: paid by {payment_method}, refund it manually")
+                log(f"  {cancelled} cancelled so far ({refunded} refunded)")
+    finally:
+        # Closing the sessions bypassed the signals that refresh cached pages
+        bump_content_version('sessions', 'home')
+        purge_content_groups('sessions', 'home')
+    return cancelled, refunded, manual, failed
+
+
+def due_cancellation_notices():
+    """Bookings cancelled with their session whose customers haven't been told yet."""
+    bookings = list(
+        Booking.objects
+        .filter(cancelled_at__isnull=False, cancellation_notified_at__isnull=True)
+        .order_by('session_id', 'language', 'id')
+    )
+    sessions = GameSession.objects.filter(pk__in={booking.session_id for booking in bookings})
+    sessions = {
+        session.pk: session
+        for session in sessions.prefetch_related(translations_prefetch(GameSession, any_language=True))
+    }
+    for booking in bookings:
+        booking.session = sessions[booking.session_id]
+    return bookings
+
+
+def send_cancellation_notices(batch_size=50, pause=1.0, dry_run=False, log=print):
+    """Email queued cancellation notices; returns (sent, failed)."""
+    bookings = due_cancellation_notices()
+    if dry_run:
+        for booking in bookings:
+            log(f"  {booking.booking_reference} {booking.customer_email} ({booking.language}) - {booking.session}")
+        return len(bookings), 0
+    return send_booking_emails(bookings, 'session_cancelled', 'cancellation_notified_at', batch_size, pause, log)
@@ -1,8 +1,14 @@
+import uuid
+
 from django import forms
 from .models import Booking
 
 
 class BookingForm(forms.ModelForm):
+    # One per rendered form, so a double-clicked or retried submit is
+    # recognised instead of booking twice (see views.book_session)
+    submission_token = forms.UUIDField(required=False, widget=forms.HiddenInput)
+
     class Meta:
         model = Booking
         fields = ['customer_name', 'customer_email', 'customer_phone',
@@ -32,30 +38,35 @@ class BookingForm(forms.ModelForm):
             }),
         }
 
-    def __init__(self, *args, session=None, **kwargs):
+    def __init__(self, *args, booking_context=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.session = session
+        # events.services.BookingContext, shared with the view so availability
+        # and ticket types are not re-queried here
+        self.booking_context = booking_context
+        if not self.is_bound:
+            self.fields['submission_token'].initial = uuid.uuid4()
 
-        if session and session.has_ticket_types:
+        if booking_context and booking_context.has_ticket_types:
             # participants is derived from ticket_type + ticket_quantity in
             # Booking.save(), so we don't need the user to supply it.
             # Make the field optional and set a safe default so ModelForm
             # validation passes; the real value is overwritten on save().
             self.fields['participants'].required = False
             self.fields['participants'].initial = 1
-        elif session:
+        elif booking_context:
             # Legacy mode: cap the widget max at available spots
-            self.fields['participants'].widget.attrs['max'] = session.available_spots
+            self.fields['participants'].widget.attrs['max'] = booking_context.available_spots
 
     def clean_participants(self):
         # Skip capacity validation when ticket-type pricing is active —
         # the view handles that check against (participant_count × quantity).
-        if self.session and self.session.has_ticket_types:
+        if self.booking_context and self.booking_context.has_ticket_types:
             return self.cleaned_data.get('participants') or 1
 
         participants = self.cleaned_data.get('participants')
-        if participants and self.session and participants > self.session.available_spots:
+        available_spots = self.booking_context.available_spots if self.booking_context else None
+        if participants and available_spots is not None and participants > available_spots:
             raise forms.ValidationError(
-                f'Only {self.session.available_spots} spots available for this session.'
+                f'Only {available_spots} spots available for this session.'
             )
-        return participants
\ No newline at end of file
+        return participants
@@ -0,0 +1,144 @@
+"""
+Per-session stock of limited ticket types.
+
+    if not take_tickets(session.id, ticket_type, 2):
+        ...  # sold out
+    left = tickets_left([(session.id, ticket_type)])[session.id, ticket_type.id]
+
+A ticket type with a per_session_limit may sell at most that many tickets
+on each session. What each session has sold is a TicketStock row, and
+taking tickets is one conditional UPDATE (SET sold = sold + n WHERE
+sold <= limit - n): of two customers racing for the last ticket, exactly
+one gets it, without locking or re-counting bookings. Counting sold
+rather than remaining tickets means the limit can be changed in the admin
+at any time.
+
+Tickets are taken when the booking is made, so an unpaid booking holds
+them until it is paid or the reaper expires it. They come back when a
+booking is cancelled, expired or refunded (events.states), or deleted.
+A row is created from the bookings so far the first time a type is
+booked on a session, and recounted when a booking is edited in the admin.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Greatest
+
+from .models import Booking, TicketStock
+
+
+class SoldOut(Exception):
+    """Not enough tickets of a limited type left on the session."""
+
+
+def _sold(session_ids, ticket_type_ids):
+    """{(session id, ticket type id): tickets held by bookings that aren't cancelled}"""
+    rows = (
+        Booking.objects
+        .filter(session_id__in=session_ids, ticket_type_id__in=ticket_type_ids)
+        .exclude(status='cancelled')
+        .values_list('session_id', 'ticket_type_id')
+        .annotate(sold=Sum('ticket_quantity'))
+        .order_by()
+    )
+    return {(session_id, ticket_type_id): sold for session_id, ticket_type_id, sold in rows}
+
+
+def _create_stock(session_id, ticket_type_id):
+    sold = _sold([session_id], [ticket_type_id]).get((session_id, ticket_type_id), 0)
+    try:
+        with transaction.atomic():
+            TicketStock.objects.create(session_id=session_id, ticket_type_id=ticket_type_id, sold=sold)
+    except IntegrityError:
+        # Created by a concurrent booking
+        pass
+
+
+def take_tickets(session_id, ticket_type, quantity):
+    """Take quantity tickets of ticket_type on the session; False if there aren't that many left."""
+    if quantity < 1:
+        raise ValueError(f'Cannot take {quantity} tickets')
+    limit = ticket_type.per_session_limit
+    if limit is None:
+        return True
+    stock = TicketStock.objects.filter(session_id=session_id, ticket_type_id=ticket_type.pk)
+    if stock.filter(sold__lte=limit - quantity).update(sold=F('sold') + quantity):
+        return True
+    if stock.exists():
+        return False
+    _create_stock(session_id, ticket_type.pk)
+    return bool(stock.filter(sold__lte=limit - quantity).update(sold=F('sold') + quantity))
+
+
+def return_tickets(session_id, ticket_type_id, quantity):
+    TicketStock.objects.filter(session_id=session_id, ticket_type_id=ticket_type_id).update(
+        sold=Greatest(F('sold') - quantity, Value(0)),
+    )
+
+
+def tickets_left(pairs):
+    """
+    {(session id, ticket type id): tickets left} for (session id, ticket
+    type) pairs of limited types; one query, two if some have no stock yet.
+    """
+    pairs = [(session_id, ticket_type) for session_id, ticket_type in pairs if ticket_type.per_session_limit is not None]
+    if not pairs:
+        return {}
+    session_ids = {session_id for session_id, _ticket_type in pairs}
+    ticket_type_ids = {ticket_type.pk for _session_id, ticket_type in pairs}
+    sold = dict(
+        ((session_id, ticket_type_id), sold)
+        for session_id, ticket_type_id, sold in TicketStock.objects.filter(
+            session_id__in=session_ids, ticket_type_id__in=ticket_type_ids,
+        ).values_list('session_id', 'ticket_type_id', 'sold')
+    )
+    if any((session_id, ticket_type.pk) not in sold for session_id, ticket_type in pairs):
+        # Never booked since the limit was set: count the bookings
+        for key, count in _sold(session_ids, ticket_type_ids).items():
+            sold.setdefault(key, count)
+    return {
+        (session_id, ticket_type.pk): max(ticket_type.per_session_limit - sold.get((session_id, ticket_type.pk), 0), 0)
+        for session_id, ticket_type in pairs
+    }
+
+
+def recount_stock(session_ids):
+    """Recount the stock rows of some sessions from their bookings."""
+    rows = list(TicketStock.objects.filter(session_id__in=session_ids))
+    if not rows:
+        return
+    sold = _sold(session_ids, {row.ticket_type_id for row in rows})
+    for row in rows:
+        count = sold.get((row.session_id, row.ticket_type_id), 0)
+        if row.sold != count:
+            TicketStock.objects.filter(pk=row.pk).update(sold=count)
+
+
+# ── Signal handlers (connected in EventsConfig.ready) ────────────────────────
+
+def booking_transitioned(sender, transition, bookings, **kwargs):
+    if transition.target.get('status') != 'cancelled':
+        return
+    if isinstance(bookings, list):
+        bookings = Booking.objects.filter(pk__in=[booking.pk for booking in bookings])
+    rows = (
+        bookings
+        .filter(ticket_type__per_session_limit__isnull=False)
+        .values_list('session_id', 'ticket_type_id')
+        .annotate(quantity=Sum('ticket_quantity'))
+        .order_by()
+    )
+    for session_id, ticket_type_id, quantity in rows:
+        return_tickets(session_id, ticket_type_id, quantity)
+
+
+def booking_saved(sender, instance, created, update_fields=None, **kwargs):
+    # New bookings took their tickets before saving (events.views); a full
+    # save of an existing one is an admin edit that may change anything
+    if not created and update_fields is None:
+        session_id = instance.session_id
+        transaction.on_commit(lambda: recount_stock([session_id]))
+
+
+def booking_deleted(sender, instance, **kwargs):
+    if instance.ticket_type_id and instance.status != 'cancelled':
+        return_tickets(instance.session_id, instance.ticket_type_id, instance.ticket_quantity)
@@ -1,15 +1,21 @@
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from django.utils import timezone
-from datetime import datetime, timedelta, time
-from events.models import GameSession
+from datetime import datetime
+from events.models import Event
+from events.schedule import WEEKDAYS, occurrence_dates, find_conflicts, create_sessions
 
 '''
 python3 manage.py create_gamesessions \
     --name 'VUM Gaming @ Atomic Bunker' \
     --description 'Join our big event this autumn in the Atomic Bunker in Zagreb!' \
-    --game_type mixed \
+    --name_hr 'VUM Gaming @ Atomski Bunker' \
+    --description_hr 'Pridružite nam se ove jeseni u Atomskom bunkeru u Zagrebu!' \
+    --event 3 \
     --start_date 2025-11-17 \
-    --end_date 2025-11-22 \
+    --end_date 2026-11-16 \
+    --weekdays mon,wed,fri \
+    --interval 2 \
+    --exclude 2025-12-25,2026-01-01 \
     --start_time 12:00 \
     --end_time 20:00 \
     --price 5.00 \
@@ -17,18 +23,29 @@ python3 manage.py create_gamesessions \
 '''
 
 class Command(BaseCommand):
-    help = "Bulk create GameSessions between a start and end date"
+    help = "Bulk create recurring GameSessions (with translations) between a start and end date"
 
     def add_arguments(self, parser):
-        parser.add_argument("--name", type=str, required=True, help="Name for the game session")
-        parser.add_argument("--description", type=str, default="", help="Description of the session")
-        parser.add_argument("--game_type", type=str, default="mixed", choices=[g[0] for g in GameSession.GAME_TYPES])
+        parser.add_argument("--name", type=str, required=True, help="Session name (English)")
+        parser.add_argument("--description", type=str, default="", help="Session description (English)")
+        parser.add_argument("--name_hr", type=str, help="Session name (Croatian); defaults to --name")
+        parser.add_argument("--description_hr", type=str, help="Session description (Croatian); defaults to --description")
+        parser.add_argument("--button", type=str, default="", help="Booking button label")
+        parser.add_argument("--event", type=int, help="ID of the Event the sessions belong to")
+        parser.add_argument("--collab", type=str, default="", help="Collaboration partner")
+        parser.add_argument("--address", type=str, default="", help="Venue address")
+        parser.add_argument("--city", type=str, default="", help="Venue city")
         parser.add_argument("--start_date", type=str, required=True, help="Start date (YYYY-MM-DD)")
         parser.add_argument("--end_date", type=str, required=True, help="End date (YYYY-MM-DD)")
+        parser.add_argument("--weekdays", type=str, help="Comma-separated weekdays, e.g. mon,wed,fri (default: every day)")
+        parser.add_argument("--interval", type=int, default=1, help="Repeat every N weeks")
+        parser.add_argument("--exclude", type=str, default="", help="Comma-separated dates to skip (YYYY-MM-DD)")
         parser.add_argument("--start_time", type=str, required=True, help="Start time (HH:MM)")
         parser.add_argument("--end_time", type=str, required=True, help="End time (HH:MM)")
-        parser.add_argument("--price", type=float, required=True, help="Price per person")
+        parser.add_argument("--price", type=float, default=0, help="Price per person (fallback when the event has no ticket types)")
         parser.add_argument("--max_participants", type=int, default=8, help="Maximum number of participants")
+        parser.add_argument("--allow_overlap", action="store_true", help="Only skip dates with the exact same start time")
+        parser.add_argument("--dry_run", action="store_true", help="Show what would be created without saving")
 
     def handle(self, *args, **options):
         try:
@@ -36,38 +53,78 @@ class Command(BaseCommand):
             end_date = datetime.strptime(options["end_date"], "%Y-%m-%d").date()
             start_time = datetime.strptime(options["start_time"], "%H:%M").time()
             end_time = datetime.strptime(options["end_time"], "%H:%M").time()
+            exclude = [
+                datetime.strptime(d.strip(), "%Y-%m-%d").date()
+                for d in options["exclude"].split(",") if d.strip()
+            ]
         except ValueError as e:
             raise CommandError(f"Invalid date/time format: {e}")
 
         if end_date < start_date:
             raise CommandError("End date must be after start date")
+        if end_time <= start_time:
+            raise CommandError("End time must be after start time")
 
-        delta = (end_date - start_date).days + 1
-        sessions_to_create = []
+        weekdays = None
+        if options["weekdays"]:
+            try:
+                weekdays = {WEEKDAYS.index(d.strip().lower()[:3]) for d in options["weekdays"].split(",")}
+            except ValueError:
+                raise CommandError(f"Invalid weekdays: {options['weekdays']} (use mon,tue,...)")
 
-        for i in range(delta):
-            date = start_date + timedelta(days=i)
-            # skip duplicates (if same date/time exists)
-            if GameSession.objects.filter(date=date, start_time=start_time).exists():
-                self.stdout.write(self.style.WARNING(f"Skipping {date} - already exists"))
-                continue
+        event = None
+        if options["event"]:
+            try:
+                event = Event.objects.get(id=options["event"])
+            except Event.DoesNotExist:
+                raise CommandError(f"Event {options['event']} does not exist")
 
-            session = GameSession(
-                name=options["name"],
-                description=options["description"],
-                game_type=options["game_type"],
-                date=date,
-                start_time=start_time,
-                end_time=end_time,
-                max_participants=options["max_participants"],
-                price_per_person=options["price"],
-                is_active=True,
-            )
-            sessions_to_create.append(session)
+        try:
+            dates = occurrence_dates(start_date, end_date, weekdays, options["interval"], exclude)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        conflicts = find_conflicts(dates, start_time, end_time, allow_overlap=options["allow_overlap"])
+        for date in sorted(conflicts):
+            self.stdout.write(self.style.WARNING(f"Skipping {date} - conflicts with an existing session"))
+        dates = [d for d in dates if d not in conflicts]
 
-        if not sessions_to_create:
+        if not dates:
             self.stdout.write(self.style.WARNING("No new sessions to create."))
             return
 
-        GameSession.objects.bulk_create(sessions_to_create)
-        self.stdout.write(self.style.SUCCESS(f"✅ Created {len(sessions_to_create)} game sessions successfully!"))
\ No newline at end of file
+        if options["dry_run"]:
+            for date in dates:
+                self.stdout.write(f"  {date:%a %Y-%m-%d} {start_time:%H:%M}-{end_time:%H:%M}")
+            self.stdout.write(self.style.SUCCESS(f"Would create {len(dates)} game sessions"))
+            return
+
+        english = {
+            "name": options["name"],
+            "description": options["description"],
+            "button": options["button"],
+        }
+        croatian = {
+            "name": options["name_hr"] or options["name"],
+            "description": options["description_hr"] or options["description"],
+            "button": options["button"],
+        }
+        translations = {
+            code: (croatian if code == "hr" else english)
+            for code, _name in settings.LANGUAGES
+        }
+
+        sessions = create_sessions(
+            dates,
+            start_time,
+            end_time,
+            translations,
+            event=event,
+            collab=options["collab"],
+            address=options["address"],
+            city=options["city"],
+            max_participants=options["max_participants"],
+            price_per_person=options["price"],
+            is_active=True,
+        )
+        self.stdout.write(self.style.SUCCESS(f"✅ Created {len(sessions)} game sessions successfully!"))
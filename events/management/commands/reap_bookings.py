@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from events.reaper import reap_abandoned_bookings
+
+'''
+python3 manage.py reap_bookings --older_than 120
+
+Cancels bookings that were never paid or confirmed, and their Stripe
+payment intents. Meant to run from cron, e.g. every 30 minutes:
+
+*/30 * * * * cd /var/www/vumgames && venv/bin/python manage.py reap_bookings
+'''
+
+class Command(BaseCommand):
+    help = "Cancel unpaid bookings (and their payment intents) older than N minutes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older_than", type=int, default=120, help="Minutes a booking may stay unpaid")
+        parser.add_argument("--batch_size", type=int, default=200, help="Bookings per batch")
+        parser.add_argument("--workers", type=int, default=8, help="Parallel Stripe cancellations")
+        parser.add_argument("--dry_run", action="store_true", help="Count what would be cancelled")
+
+    def handle(self, *args, **options):
+        if options["older_than"] < 15:
+            raise CommandError("--older_than must be at least 15 minutes; customers may still be paying")
+        if options["batch_size"] < 1 or options["workers"] < 1:
+            raise CommandError("--batch_size and --workers must be at least 1")
+
+        cancelled, seats, skipped = reap_abandoned_bookings(
+            older_than=timedelta(minutes=options["older_than"]),
+            batch_size=options["batch_size"],
+            workers=options["workers"],
+            dry_run=options["dry_run"],
+            log=self.stdout.write,
+        )
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"Would cancel {cancelled} bookings ({seats} seats)"))
+            return
+        self.stdout.write(self.style.SUCCESS(f"✅ Cancelled {cancelled} abandoned bookings, released {seats} seats"))
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"{skipped} left for a later run"))
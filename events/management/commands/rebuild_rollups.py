@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from events.rollups import rebuild_rollups
+
+'''
+python3 manage.py rebuild_rollups
+
+Recomputes the booking report rollups from every booking. They are kept
+current as bookings change; the nightly rebuild repairs anything changed
+around that (bulk updates in a shell, ...):
+
+0 3 * * * cd /var/www/vumgames && venv/bin/python manage.py rebuild_rollups
+'''
+
+class Command(BaseCommand):
+    help = "Rebuild the booking report rollups from the bookings"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch_size", type=int, default=1000, help="Rollup rows per insert")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch_size must be at least 1")
+
+        started = time.monotonic()
+        count = rebuild_rollups(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Rebuilt {count} rollup rows in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from events.cancellations import send_cancellation_notices
+
+'''
+python3 manage.py send_cancellation_notices
+
+Emails customers whose bookings were cancelled with their session (the
+"Cancel sessions and refund bookings" admin action queues them). Meant to
+run from cron, e.g. every 5 minutes:
+
+*/5 * * * * cd /var/www/vumgames && venv/bin/python manage.py send_cancellation_notices
+
+Bookings are marked as notified, so overlapping or repeated runs are safe.
+'''
+
+class Command(BaseCommand):
+    help = "Email customers whose bookings were cancelled along with their session"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch_size", type=int, default=50, help="Messages per batch")
+        parser.add_argument("--pause", type=float, default=1.0, help="Seconds to wait between batches")
+        parser.add_argument("--dry_run", action="store_true", help="List who would be notified without sending")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch_size must be at least 1")
+
+        sent, failed = send_cancellation_notices(
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            dry_run=options["dry_run"],
+            log=self.stdout.write,
+        )
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"Would send {sent} cancellation notices"))
+            return
+        self.stdout.write(self.style.SUCCESS(f"✅ Sent {sent} cancellation notices"))
+        if failed:
+            self.stdout.write(self.style.WARNING(f"{failed} failed and will be retried on the next run"))
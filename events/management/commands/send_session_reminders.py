@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from events.reminders import send_session_reminders
+
+'''
+python3 manage.py send_session_reminders --hours 24
+
+Meant to run from cron, e.g. every 15 minutes:
+
+*/15 * * * * cd /var/www/vumgames && venv/bin/python manage.py send_session_reminders --hours 24
+
+Bookings are marked as reminded, so overlapping or repeated runs are safe.
+'''
+
+class Command(BaseCommand):
+    help = "Email reminders to confirmed bookings for sessions starting in the next N hours"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=24, help="Remind sessions starting within this many hours")
+        parser.add_argument("--batch_size", type=int, default=50, help="Messages per batch")
+        parser.add_argument("--pause", type=float, default=1.0, help="Seconds to wait between batches")
+        parser.add_argument("--dry_run", action="store_true", help="List who would be reminded without sending")
+
+    def handle(self, *args, **options):
+        if options["hours"] < 1:
+            raise CommandError("--hours must be at least 1")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch_size must be at least 1")
+
+        sent, failed = send_session_reminders(
+            hours=options["hours"],
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            dry_run=options["dry_run"],
+            log=self.stdout.write,
+        )
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"Would send {sent} reminders"))
+            return
+        self.stdout.write(self.style.SUCCESS(f"✅ Sent {sent} reminders"))
+        if failed:
+            self.stdout.write(self.style.WARNING(f"{failed} failed and will be retried on the next run"))
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-19 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0011_booking_check_in'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='language',
+            field=models.CharField(choices=[('hr', 'Croatian'), ('en', 'English')], default='hr', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='reminder_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-19 17:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0012_booking_language_reminder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='stripe_client_secret',
+            field=models.CharField(blank=True, editable=False, max_length=300),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='stripe_intent_status',
+            field=models.CharField(blank=True, max_length=40),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='stripe_intent_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
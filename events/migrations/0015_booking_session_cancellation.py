@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-19 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0014_booking_status_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='cancellation_notified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='cancelled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='refund_id',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+    ]
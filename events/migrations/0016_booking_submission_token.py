@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 17:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0015_booking_session_cancellation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='submission_token',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
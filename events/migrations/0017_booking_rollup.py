@@ -0,0 +1,43 @@
+# Generated by Django 4.2 on 2026-10-19 17:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0016_booking_submission_token'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('session_date', models.DateField()),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('confirmed', models.PositiveIntegerField(default=0)),
+                ('cancelled', models.PositiveIntegerField(default=0)),
+                ('seats', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('refunded', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('event', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='events.event')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='events.gamesession')),
+                ('ticket_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='events.tickettype')),
+            ],
+            options={
+                'verbose_name': 'booking report',
+                'verbose_name_plural': 'booking reports',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='bookingrollup',
+            index=models.Index(fields=['day'], name='rollup_day'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingrollup',
+            index=models.Index(fields=['session_date'], name='rollup_session_date'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-19 17:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0017_booking_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tickettype',
+            name='per_session_limit',
+            field=models.PositiveIntegerField(blank=True, help_text='Tickets of this type on sale per session; leave empty for no limit.', null=True),
+        ),
+        migrations.CreateModel(
+            name='TicketStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sold', models.PositiveIntegerField(default=0)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='events.gamesession')),
+                ('ticket_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='events.tickettype')),
+            ],
+            options={
+                'unique_together': {('session', 'ticket_type')},
+            },
+        ),
+    ]
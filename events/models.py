@@ -2,11 +2,12 @@ from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from parler.models import TranslatableModel, TranslatedFields
-from datetime import datetime
-import stripe
+from datetime import datetime, timedelta
 from django.conf import settings
 import uuid
 
+from .payments import PaymentError, get_provider
+
 
 class Event(models.Model):
     """
@@ -42,6 +43,12 @@ class TicketType(models.Model):
         validators=[MinValueValidator(1), MaxValueValidator(20)],
         help_text="Number of spots this ticket type occupies."
     )
+    # Optional stock: at most this many tickets of the type per session (events.inventory)
+    per_session_limit = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Tickets of this type on sale per session; leave empty for no limit."
+    )
     is_active = models.BooleanField(default=True)
     order = models.PositiveIntegerField(default=0, help_text="Display order (lower = first)")
 
@@ -97,9 +104,12 @@ class GameSession(TranslatableModel):
     @property
     def available_spots(self):
         """Calculate remaining spots for this session"""
-        booked_participants = sum(
-            booking.participants for booking in self.bookings.filter(is_confirmed=True)
-        )
+        # Listings annotate this (events.services.with_availability)
+        booked_participants = getattr(self, 'booked_participants', None)
+        if booked_participants is None:
+            booked_participants = sum(
+                booking.participants for booking in self.bookings.filter(is_confirmed=True)
+            )
         return max(0, self.max_participants - booked_participants)
 
     @property
@@ -156,9 +166,13 @@ class Booking(models.Model):
         validators=[MinValueValidator(1), MaxValueValidator(10)]
     )
     special_requests = models.TextField(blank=True)
+    # Site language the booking was made in; used for follow-up emails
+    language = models.CharField(max_length=10, choices=settings.LANGUAGES, default=settings.LANGUAGE_CODE)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     is_confirmed = models.BooleanField(default=False)
     booking_reference = models.CharField(max_length=20, unique=True)
+    # From the booking form; a resubmitted form finds its booking by it
+    submission_token = models.UUIDField(null=True, blank=True, unique=True, editable=False)
     total_price = models.DecimalField(max_digits=8, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -180,40 +194,137 @@ class Booking(models.Model):
         ('cash', 'Cash'),
     ], default='card')
     stripe_payment_intent_id = models.CharField(max_length=200, blank=True)
+    # Local copy of the intent, so the payment page needs no Stripe call;
+    # kept current by the webhook (sync_payment_intent)
+    stripe_client_secret = models.CharField(max_length=300, blank=True, editable=False)
+    stripe_intent_status = models.CharField(max_length=40, blank=True)
+    stripe_intent_synced_at = models.DateTimeField(null=True, blank=True)
     payment_completed_at = models.DateTimeField(null=True, blank=True)
 
+    # Claimed by the reminder job before sending (events.reminders)
+    reminder_sent_at = models.DateTimeField(null=True, blank=True)
+
+    # Set when staff cancel the whole session (events.cancellations); the
+    # cancellation notice job claims cancellation_notified_at before sending
+    cancelled_at = models.DateTimeField(null=True, blank=True)
+    refund_id = models.CharField(max_length=200, blank=True)
+    cancellation_notified_at = models.DateTimeField(null=True, blank=True)
+
+    # Door check-in (events.checkin)
+    checked_in_at = models.DateTimeField(null=True, blank=True)
+    checked_in_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+
+    class Meta:
+        indexes = [
+            # Finding stale unpaid bookings (events.reaper)
+            models.Index(fields=['status', 'created_at'], name='booking_status_created'),
+        ]
+
+    # Intent states in which a missed webhook could leave the local copy behind
+    STRIPE_UNSETTLED_STATUSES = ('processing', 'requires_action', 'requires_capture')
+    STRIPE_STALE_AFTER = timedelta(minutes=10)
+
     def create_payment_intent(self):
         """Create Stripe payment intent"""
-        if not settings.STRIPE_SECRET_KEY:
+        provider = get_provider('stripe')
+        if not provider.enabled:
             return None
 
-        stripe.api_key = settings.STRIPE_SECRET_KEY
-
         try:
-            intent = stripe.PaymentIntent.create(
+            intent = provider.create_intent(
                 amount=int(self.total_price * 100),  # Convert to cents
                 currency='eur',
                 metadata={
                     'booking_id': str(self.id),
                     'booking_reference': self.booking_reference,
                     'session_name': self.session.safe_translation_getter('name', any_language=True),
-                }
+                },
+                # A double click creates one intent, not two; a replacement
+                # for a cancelled intent gets a key of its own
+                idempotency_key=(
+                    f'booking-{self.pk}-intent-{self.stripe_payment_intent_id or "new"}'
+                    f'-{int(self.total_price * 100)}'
+                ),
             )
-            self.stripe_payment_intent_id = intent.id
-            self.payment_status = 'processing'
-            self.save()
-            return intent
-        except Exception as e:
+        except PaymentError as e:
+            print(f"Stripe error: {e}")
+            return None
+        self.payment_status = 'processing'
+        self.sync_payment_intent(intent, extra_fields=['payment_status'])
+        return intent
+
+    def sync_payment_intent(self, intent, extra_fields=()):
+        """Store a PaymentIntent (API object or webhook payload) on the booking."""
+        self.stripe_payment_intent_id = intent['id']
+        self.stripe_client_secret = intent.get('client_secret') or self.stripe_client_secret
+        self.stripe_intent_status = intent.get('status', '')
+        self.stripe_intent_synced_at = timezone.now()
+        self.save(update_fields=[
+            'stripe_payment_intent_id', 'stripe_client_secret', 'stripe_intent_status',
+            'stripe_intent_synced_at', 'updated_at', *extra_fields,
+        ])
+
+    @property
+    def payment_intent_is_stale(self):
+        """Whether the stored intent must be re-read from Stripe before use."""
+        if not self.stripe_payment_intent_id:
+            return False
+        if not self.stripe_client_secret or self.stripe_intent_synced_at is None:
+            # Created before the intent was stored locally
+            return True
+        return (
+            self.stripe_intent_status in self.STRIPE_UNSETTLED_STATUSES
+            and timezone.now() - self.stripe_intent_synced_at > self.STRIPE_STALE_AFTER
+        )
+
+    def refresh_payment_intent(self):
+        """Re-read the intent from Stripe; returns it, or None if that failed."""
+        try:
+            intent = get_provider('stripe').retrieve_intent(self.stripe_payment_intent_id)
+        except PaymentError as e:
             print(f"Stripe error: {e}")
             return None
+        self.sync_payment_intent(intent)
+        return intent
+
+    def card_client_secret(self):
+        """
+        The client secret for paying this booking by card, creating the
+        intent on first use. Calls Stripe only when there is no intent yet,
+        the stored one is stale, or it was cancelled. None for a cancelled
+        booking: its seats may already have gone to someone else.
+        """
+        if self.status == 'cancelled':
+            return None
+        if self.stripe_payment_intent_id and self.payment_intent_is_stale:
+            self.refresh_payment_intent()
+        if not self.stripe_payment_intent_id or self.stripe_intent_status == 'canceled':
+            self.create_payment_intent()
+        return self.stripe_client_secret or None
 
     def __str__(self):
         return f"{self.customer_name} - {self.session.safe_translation_getter('name', any_language=True)} ({self.participants} people)"
 
+    # Fields the price is derived from, or that hold it
+    PRICING_FIELDS = {'session', 'ticket_type', 'ticket_quantity', 'participants', 'total_price'}
+
     def save(self, *args, **kwargs):
         if not self.booking_reference:
             self.booking_reference = str(uuid.uuid4())[:8].upper()
 
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not self.PRICING_FIELDS.intersection(update_fields):
+            # A partial save that can't change the price; don't load the
+            # session and ticket type just to recompute it
+            super().save(*args, **kwargs)
+            return
+
         # Price calculation:
         # 1. If a TicketType is set → price = ticket_type.price × ticket_quantity
         # 2. Fallback → legacy price_per_person × participants (existing behaviour)
@@ -224,4 +335,54 @@ class Booking(models.Model):
         else:
             self.total_price = self.participants * self.session.price_per_person
 
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+
+class TicketStock(models.Model):
+    """
+    Tickets of a limited type (TicketType.per_session_limit) taken on one
+    session by bookings that aren't cancelled; maintained by events.inventory.
+    """
+    session = models.ForeignKey(GameSession, on_delete=models.CASCADE, related_name='+')
+    ticket_type = models.ForeignKey(TicketType, on_delete=models.CASCADE, related_name='+')
+    sold = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['session', 'ticket_type']
+
+    def __str__(self):
+        return f"{self.session_id} / {self.ticket_type_id}: {self.sold} sold"
+
+
+class BookingRollup(models.Model):
+    """
+    Booking totals for one (session, ticket type, day the bookings were
+    made); maintained by events.rollups, so reports never aggregate raw
+    bookings.
+    """
+    session = models.ForeignKey(GameSession, on_delete=models.CASCADE, related_name='+')
+    ticket_type = models.ForeignKey(TicketType, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    day = models.DateField()
+    # Copied from the session so reports can filter without a join
+    session_date = models.DateField()
+    event = models.ForeignKey(Event, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    bookings = models.PositiveIntegerField(default=0)
+    confirmed = models.PositiveIntegerField(default=0)
+    cancelled = models.PositiveIntegerField(default=0)
+    # Participants of confirmed bookings
+    seats = models.PositiveIntegerField(default=0)
+    # Paid (payment_status completed) and refunded totals
+    revenue = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    refunded = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'booking report'
+        verbose_name_plural = 'booking reports'
+        indexes = [
+            models.Index(fields=['day'], name='rollup_day'),
+            models.Index(fields=['session_date'], name='rollup_session_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.session_id} / {self.ticket_type_id} / {self.day}"
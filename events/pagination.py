@@ -0,0 +1,56 @@
+import base64
+from datetime import date, time
+
+from django.db.models import Q
+
+# Sessions per page, and how far past the first session of a page it may
+# reach. Together they keep every page small no matter how far ahead the
+# calendar is filled.
+SESSIONS_PAGE_SIZE = 60
+SESSIONS_WINDOW_DAYS = 56
+
+
+def encode_cursor(session):
+    """Opaque cursor pointing just past ``session`` in (date, start_time, id) order."""
+    raw = f"{session.date.isoformat()}|{session.start_time.isoformat()}|{session.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (date, start_time, id); raises ValueError for malformed cursors."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        date_str, time_str, id_str = raw.split('|')
+        return date.fromisoformat(date_str), time.fromisoformat(time_str), int(id_str)
+    except (TypeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def keyset_page(queryset, cursor=None, page_size=SESSIONS_PAGE_SIZE, window_days=SESSIONS_WINDOW_DAYS):
+    """
+    One page of GameSessions ordered by (date, start_time, id), starting after
+    ``cursor``. The page holds at most ``page_size`` sessions, all within
+    ``window_days`` of the page's first session.
+
+    Returns (sessions, next_cursor); next_cursor is None on the last page.
+    """
+    queryset = queryset.order_by('date', 'start_time', 'id')
+    if cursor:
+        after_date, after_time, after_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(date__gt=after_date)
+            | Q(date=after_date, start_time__gt=after_time)
+            | Q(date=after_date, start_time=after_time, id__gt=after_id)
+        )
+
+    # One extra row tells us whether another page exists
+    rows = list(queryset[:page_size + 1])
+    sessions = rows[:page_size]
+    if sessions and window_days:
+        last_date = sessions[0].date.toordinal() + window_days
+        sessions = [s for s in sessions if s.date.toordinal() <= last_date]
+
+    has_more = len(rows) > len(sessions)
+    next_cursor = encode_cursor(sessions[-1]) if has_more and sessions else None
+    return sessions, next_cursor
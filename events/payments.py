@@ -0,0 +1,368 @@
+"""
+Payment provider clients.
+
+    stripe_provider = get_provider('stripe')
+    intent = stripe_provider.create_intent(2000, 'eur', metadata, idempotency_key='booking-12-...')
+
+Every outbound call goes through PaymentProvider.call(), which
+
+- uses one keep-alive HTTP session per process for all providers,
+- bounds each attempt with connect/read timeouts and the whole call with
+  PAYMENT_CALL_BUDGET, so a slow provider can't pin a worker until
+  gunicorn kills it,
+- retries transient failures (connection errors, timeouts, 429, 5xx) a
+  bounded number of times with backoff - writes only when they carry an
+  idempotency key, so a retry can never charge or refund twice,
+- stops calling a provider that keeps failing (circuit breaker) and fails
+  fast with ProviderUnavailable until it has had time to recover,
+- records the latency and outcome of every call (payment_metrics()).
+"""
+import abc
+import logging
+import threading
+import time
+
+import requests
+import stripe
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentError(Exception):
+    """The provider refused the request (declined card, bad parameters, ...)."""
+
+
+class ProviderUnavailable(PaymentError):
+    """The provider could not be reached in time, or its circuit is open."""
+
+
+# ── Shared HTTP session ──────────────────────────────────────────────────────
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def http_session():
+    """One pooled keep-alive session per process, shared by all providers."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=0)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def _timeouts():
+    return (settings.PAYMENT_CONNECT_TIMEOUT, settings.PAYMENT_READ_TIMEOUT)
+
+
+# ── Circuit breaker ──────────────────────────────────────────────────────────
+
+class CircuitBreaker:
+    """
+    Closed: calls go through. After `threshold` consecutive transient
+    failures it opens and rejects calls for `reset_after` seconds, then
+    lets a single trial call through (half-open); its outcome closes or
+    re-opens the circuit. State is per process.
+    """
+
+    def __init__(self, threshold=5, reset_after=30.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+    def release(self):
+        """A call ended without telling anything about the provider."""
+        with self._lock:
+            self._trial_running = False
+
+
+# ── Metrics ──────────────────────────────────────────────────────────────────
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def _record(provider, operation, outcome, seconds):
+    with _metrics_lock:
+        stats = _metrics.setdefault((provider, operation), {
+            'calls': 0, 'ok': 0, 'declined': 0, 'failed': 0, 'rejected': 0,
+            'total_ms': 0.0, 'max_ms': 0.0,
+        })
+        stats['calls'] += 1
+        stats[outcome] += 1
+        if outcome != 'rejected':
+            ms = seconds * 1000
+            stats['total_ms'] += ms
+            stats['max_ms'] = max(stats['max_ms'], ms)
+    level = logging.INFO if outcome in ('ok', 'declined') else logging.WARNING
+    logger.log(level, "payment %s.%s %s in %.0f ms", provider, operation, outcome, seconds * 1000)
+
+
+def payment_metrics():
+    """{'stripe.create_intent': {'calls', 'ok', 'declined', 'failed', 'rejected', 'avg_ms', 'max_ms'}, ...}"""
+    with _metrics_lock:
+        snapshot = {}
+        for (provider, operation), stats in _metrics.items():
+            timed = stats['calls'] - stats['rejected']
+            snapshot[f'{provider}.{operation}'] = dict(
+                stats, avg_ms=round(stats['total_ms'] / timed, 1) if timed else 0.0,
+            )
+        return snapshot
+
+
+# ── Providers ────────────────────────────────────────────────────────────────
+
+class PaymentProvider(abc.ABC):
+    name = None
+    # What the provider's client raises when the provider refuses a request
+    # or can't be reached; anything else is a bug and propagates as it is
+    errors = ()
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(
+            threshold=settings.PAYMENT_BREAKER_THRESHOLD,
+            reset_after=settings.PAYMENT_BREAKER_RESET,
+        )
+
+    @property
+    @abc.abstractmethod
+    def enabled(self):
+        """Whether the provider is configured."""
+
+    @abc.abstractmethod
+    def is_transient(self, error):
+        """Whether `error` (one of `errors`) is worth retrying."""
+
+    def call(self, operation, fn, retry=True):
+        """
+        Run fn() against the provider with the breaker, retries and metrics.
+        Pass retry=False for writes without an idempotency key.
+        """
+        deadline = time.monotonic() + settings.PAYMENT_CALL_BUDGET
+        attempt_time = sum(_timeouts())
+        attempts = 1 + (settings.PAYMENT_MAX_RETRIES if retry else 0)
+
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                _record(self.name, operation, 'rejected', 0)
+                raise ProviderUnavailable(f"{self.name} is unavailable (circuit open)")
+
+            started = time.monotonic()
+            try:
+                result = fn()
+            except self.errors as e:
+                elapsed = time.monotonic() - started
+                if not self.is_transient(e):
+                    # The provider answered; it just said no
+                    self.breaker.success()
+                    _record(self.name, operation, 'declined', elapsed)
+                    raise PaymentError(str(e)) from e
+
+                self.breaker.failure()
+                _record(self.name, operation, 'failed', elapsed)
+                backoff = 0.25 * 2 ** attempt
+                last_attempt = attempt + 1 == attempts
+                if last_attempt or time.monotonic() + backoff + attempt_time > deadline:
+                    raise ProviderUnavailable(f"{self.name} {operation} failed: {e}") from e
+                time.sleep(backoff)
+            except Exception:
+                # Don't leave a half-open circuit waiting for this trial
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.success()
+                _record(self.name, operation, 'ok', time.monotonic() - started)
+                return result
+
+
+class StripeProvider(PaymentProvider):
+    name = 'stripe'
+    errors = (stripe.StripeError,)
+
+    def __init__(self):
+        super().__init__()
+        self.client = stripe.StripeClient(
+            settings.STRIPE_SECRET_KEY or 'unset',
+            base_addresses={'api': settings.STRIPE_API_BASE},
+            http_client=stripe.RequestsClient(timeout=_timeouts(), session=http_session()),
+            # Retries are done by call(), which also knows about the breaker
+            max_network_retries=0,
+        )
+
+    @property
+    def enabled(self):
+        return bool(settings.STRIPE_SECRET_KEY)
+
+    def is_transient(self, error):
+        if isinstance(error, (stripe.APIConnectionError, stripe.RateLimitError)):
+            return True
+        return isinstance(error, stripe.APIError) and (error.http_status or 500) >= 500
+
+    def create_intent(self, amount, currency, metadata, idempotency_key):
+        """amount in cents"""
+        return self.call('create_intent', lambda: self.client.payment_intents.create(
+            params={'amount': amount, 'currency': currency, 'metadata': metadata},
+            options={'idempotency_key': idempotency_key},
+        ))
+
+    def retrieve_intent(self, intent_id):
+        return self.call('retrieve_intent', lambda: self.client.payment_intents.retrieve(intent_id))
+
+    def cancel_intent(self, intent_id, reason='abandoned'):
+        return self.call('cancel_intent', lambda: self.client.payment_intents.cancel(
+            intent_id,
+            params={'cancellation_reason': reason},
+            options={'idempotency_key': f'cancel-{intent_id}'},
+        ))
+
+    def refund(self, intent_id, idempotency_key, amount=None):
+        params = {'payment_intent': intent_id}
+        if amount is not None:
+            params['amount'] = amount
+        return self.call('refund', lambda: self.client.refunds.create(
+            params=params, options={'idempotency_key': idempotency_key},
+        ))
+
+    def parse_webhook(self, payload, signature):
+        """Verify and decode a webhook; local only, no HTTP call."""
+        try:
+            return stripe.Webhook.construct_event(payload, signature, settings.STRIPE_WEBHOOK_SECRET)
+        except (ValueError, stripe.SignatureVerificationError) as e:
+            raise PaymentError(str(e)) from e
+
+
+class PayPalProvider(PaymentProvider):
+    name = 'paypal'
+    # HTTPError for refusals; connection errors and timeouts are retried
+    errors = (requests.RequestException,)
+
+    def __init__(self):
+        super().__init__()
+        self._token = None
+        self._token_expires = 0
+        self._token_lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(settings.PAYPAL_CLIENT_ID and settings.PAYPAL_SECRET)
+
+    def is_transient(self, error):
+        if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+            return True
+        response = getattr(error, 'response', None)
+        return response is not None and (response.status_code == 429 or response.status_code >= 500)
+
+    def _request(self, method, path, **kwargs):
+        response = http_session().request(
+            method, settings.PAYPAL_API_BASE.rstrip('/') + path, timeout=_timeouts(), **kwargs,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def _access_token(self):
+        with self._token_lock:
+            if self._token is None or time.monotonic() >= self._token_expires:
+                data = self.call('oauth_token', lambda: self._request(
+                    'POST', '/v1/oauth2/token',
+                    data={'grant_type': 'client_credentials'},
+                    auth=(settings.PAYPAL_CLIENT_ID, settings.PAYPAL_SECRET),
+                ))
+                self._token = data['access_token']
+                # Renew a minute early
+                self._token_expires = time.monotonic() + int(data.get('expires_in', 300)) - 60
+            return self._token
+
+    def _api(self, operation, method, path, request_id=None, safe=False, **kwargs):
+        headers = {'Authorization': f'Bearer {self._access_token()}'}
+        if request_id:
+            # PayPal's idempotency key
+            headers['PayPal-Request-Id'] = request_id
+        return self.call(
+            operation,
+            lambda: self._request(method, path, headers=headers, **kwargs),
+            retry=safe or method == 'GET' or bool(request_id),
+        )
+
+    def get_order(self, order_id):
+        return self._api('get_order', 'GET', f'/v2/checkout/orders/{order_id}')
+
+    def refund(self, capture_id, idempotency_key, amount=None, currency='EUR'):
+        body = {}
+        if amount is not None:
+            body['amount'] = {'value': str(amount), 'currency_code': currency}
+        return self._api('refund', 'POST', f'/v2/payments/captures/{capture_id}/refund',
+                         request_id=idempotency_key, json=body)
+
+    def verify_webhook(self, headers, event):
+        """Ask PayPal whether a webhook delivery is genuine; needs PAYPAL_WEBHOOK_ID."""
+        # A lookup despite the POST, so it may be retried
+        data = self._api('verify_webhook', 'POST', '/v1/notifications/verify-webhook-signature', safe=True, json={
+            'auth_algo': headers.get('PAYPAL-AUTH-ALGO'),
+            'cert_url': headers.get('PAYPAL-CERT-URL'),
+            'transmission_id': headers.get('PAYPAL-TRANSMISSION-ID'),
+            'transmission_sig': headers.get('PAYPAL-TRANSMISSION-SIG'),
+            'transmission_time': headers.get('PAYPAL-TRANSMISSION-TIME'),
+            'webhook_id': settings.PAYPAL_WEBHOOK_ID,
+            'webhook_event': event,
+        })
+        return data.get('verification_status') == 'SUCCESS'
+
+
+PROVIDERS = {
+    'stripe': StripeProvider,
+    'paypal': PayPalProvider,
+}
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def get_provider(name):
+    """The process-wide client for a provider, so its breaker and pool are shared."""
+    provider = _providers.get(name)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(name)
+            if provider is None:
+                provider = _providers[name] = PROVIDERS[name]()
+    return provider
@@ -0,0 +1,117 @@
+"""
+Clean-up of abandoned bookings.
+
+    reap_abandoned_bookings(older_than=timedelta(hours=2))
+
+A booking that was never confirmed or paid for `older_than` is cancelled,
+together with its Stripe PaymentIntent. Bookings are read in batches off
+the (status, created_at) index; each batch's intents are cancelled in
+parallel on a small thread pool (network calls only - the threads don't
+touch the database), and the bookings are then cancelled with one UPDATE.
+
+A booking is left alone when its intent turns out to have succeeded (the
+webhook will confirm it) or Stripe can't be reached (the next run retries).
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from .models import Booking
+from .payments import PaymentError, ProviderUnavailable, get_provider
+from .states import transition_queryset
+
+# Outcomes of cancelling one booking's intent
+CANCEL = 'cancel'
+PAID = 'paid'
+RETRY = 'retry'
+
+
+def _abandoned(cutoff):
+    return (
+        Booking.objects
+        .filter(
+            status='pending',
+            is_confirmed=False,
+            payment_status__in=('pending', 'processing'),
+            created_at__lt=cutoff,
+        )
+        .order_by('created_at', 'pk')
+    )
+
+
+def _cancel_intent(intent_id):
+    """What to do with a booking whose intent is intent_id; runs on the pool."""
+    if not intent_id:
+        return CANCEL
+    stripe_provider = get_provider('stripe')
+    try:
+        stripe_provider.cancel_intent(intent_id)
+        return CANCEL
+    except ProviderUnavailable:
+        return RETRY
+    except PaymentError:
+        # Refused: the intent is already cancelled, or paid, or mid-payment
+        pass
+    try:
+        status = stripe_provider.retrieve_intent(intent_id)['status']
+    except PaymentError:
+        return RETRY
+    if status == 'canceled':
+        return CANCEL
+    return PAID if status == 'succeeded' else RETRY
+
+
+def reap_abandoned_bookings(older_than=timedelta(hours=2), batch_size=200, workers=8,
+                            dry_run=False, log=print):
+    """
+    Cancel unpaid bookings older than older_than.
+
+    Returns (cancelled, seats released, left for later).
+    """
+    cutoff = timezone.now() - older_than
+    queryset = _abandoned(cutoff)
+    if dry_run:
+        totals = queryset.aggregate(bookings=Count('pk'), seats=Sum('participants'))
+        return totals['bookings'] or 0, totals['seats'] or 0, 0
+
+    stripe_enabled = get_provider('stripe').enabled
+    cancelled = seats = skipped = 0
+    cursor = None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            batch = queryset
+            if cursor:
+                batch = batch.filter(
+                    Q(created_at__gt=cursor[0]) | Q(created_at=cursor[0], pk__gt=cursor[1])
+                )
+            rows = list(batch.values_list('pk', 'created_at', 'booking_reference', 'stripe_payment_intent_id')[:batch_size])
+            if not rows:
+                break
+            cursor = (rows[-1][1], rows[-1][0])
+
+            intents = [intent_id if stripe_enabled else '' for _pk, _created, _ref, intent_id in rows]
+            reap = []
+            for (pk, _created, reference, intent_id), outcome in zip(rows, pool.map(_cancel_intent, intents)):
+                if outcome == CANCEL:
+                    reap.append(pk)
+                else:
+                    skipped += 1
+                    reason = 'paid, left for the webhook' if outcome == PAID else 'payment in progress or Stripe unreachable'
+                    log(f"  {reference}: {reason}")
+
+            if reap:
+                # Conditional, so a booking confirmed in the meantime stays confirmed
+                _updated, reaped = transition_queryset(
+                    Booking.objects.filter(pk__in=reap), 'expire',
+                    stripe_intent_status=Case(
+                        When(stripe_payment_intent_id='', then=F('stripe_intent_status')),
+                        default=Value('canceled'),
+                    ),
+                )
+                totals = reaped.aggregate(bookings=Count('pk'), seats=Sum('participants'))
+                cancelled += totals['bookings'] or 0
+                seats += totals['seats'] or 0
+            log(f"  {cancelled} cancelled so far ({seats} seats)")
+    return cancelled, seats, skipped
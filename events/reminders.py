@@ -0,0 +1,168 @@
+"""
+Reminder emails for upcoming sessions.
+
+    send_session_reminders(hours=24)
+
+Bookings are grouped by session and language. Each group's email is
+rendered once with placeholders in place of the per-booking fields, which
+are then filled in with plain string replacement. Everything goes out
+through one SMTP connection in throttled batches. Each batch is claimed
+(reminder_sent_at set) before it is sent, so a rerun or a second
+overlapping run never reminds anyone twice.
+
+Session cancellation notices (events.cancellations) go out the same way,
+through send_booking_emails().
+"""
+import time
+from datetime import datetime, timedelta
+from html import escape
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import select_template
+from django.utils import timezone, translation
+
+from core.translations import translations_prefetch
+from .models import Booking, GameSession
+
+# Booking fields the templates may use, as {{ booking.<field> }} without filters
+REMINDER_FIELDS = ('customer_name', 'booking_reference', 'participants', 'total_price')
+
+
+class _Placeholders:
+    """Stands in for a booking while rendering: {{ booking.customer_name }} -> %%customer_name%%."""
+
+    def __getattr__(self, name):
+        if name not in REMINDER_FIELDS:
+            raise AttributeError(name)
+        return f'%%{name}%%'
+
+
+def _template(name, language):
+    return select_template([f'emails/{language}/{name}', f'emails/{name}'])
+
+
+class ReminderTemplate:
+    """
+    The email `name` (emails/<name>.txt, .html and _subject.txt) for one
+    session in one language, rendered once.
+    """
+
+    def __init__(self, session, language, name='session_reminder'):
+        with translation.override(language):
+            session.set_current_language(language)
+            context = {'session': session, 'booking': _Placeholders()}
+            self.subject = _template(f'{name}_subject.txt', language).render(context).strip()
+            self.text = _template(f'{name}.txt', language).render(context)
+            self.html = _template(f'{name}.html', language).render(context)
+
+    def message(self, booking, connection=None):
+        values = {name: str(getattr(booking, name)) for name in REMINDER_FIELDS}
+        subject, text, html = self.subject, self.text, self.html
+        for name, value in values.items():
+            marker = f'%%{name}%%'
+            subject = subject.replace(marker, value)
+            text = text.replace(marker, value)
+            html = html.replace(marker, escape(value))
+
+        email = EmailMultiAlternatives(
+            subject=subject,
+            body=text,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[booking.customer_email],
+            connection=connection,
+        )
+        email.attach_alternative(html, "text/html")
+        return email
+
+
+def _session_start(session):
+    return timezone.make_aware(datetime.combine(session.date, session.start_time))
+
+
+def due_reminders(hours=24, now=None):
+    """Confirmed, not yet reminded bookings for sessions starting in the next ``hours``."""
+    now = now or timezone.now()
+    until = now + timedelta(hours=hours)
+    sessions = {
+        session.id: session
+        for session in (
+            GameSession.objects
+            .filter(
+                date__range=(timezone.localtime(now).date(), timezone.localtime(until).date()),
+                is_active=True,
+            )
+            .prefetch_related(translations_prefetch(GameSession, any_language=True))
+        )
+        if now < _session_start(session) <= until
+    }
+    bookings = list(
+        Booking.objects
+        .filter(session_id__in=sessions, is_confirmed=True, reminder_sent_at__isnull=True)
+        .exclude(status='cancelled')
+        .order_by('session_id', 'language', 'id')
+    )
+    for booking in bookings:
+        # Share the prefetched session instead of loading it per booking
+        booking.session = sessions[booking.session_id]
+    return bookings
+
+
+def _claim(bookings, field):
+    """Stamp `field` on bookings where it is still empty; returns the ones this run won."""
+    claimed_at = timezone.now()
+    ids = [booking.pk for booking in bookings]
+    Booking.objects.filter(pk__in=ids, **{f'{field}__isnull': True}).update(**{field: claimed_at})
+    won = set(
+        Booking.objects.filter(pk__in=ids, **{field: claimed_at}).values_list('pk', flat=True)
+    )
+    return [booking for booking in bookings if booking.pk in won]
+
+
+def send_session_reminders(hours=24, batch_size=50, pause=1.0, dry_run=False, log=print):
+    """Send due reminders; returns (sent, failed)."""
+    bookings = due_reminders(hours)
+    if dry_run:
+        for booking in bookings:
+            log(f"  {booking.booking_reference} {booking.customer_email} ({booking.language}) - {booking.session}")
+        return len(bookings), 0
+    return send_booking_emails(bookings, 'session_reminder', 'reminder_sent_at', batch_size, pause, log)
+
+
+def send_booking_emails(bookings, name, claim_field, batch_size=50, pause=1.0, log=print):
+    """
+    Send the email `name` to bookings (ordered by session and language,
+    with their sessions prefetched), claiming each batch through the
+    booking's `claim_field` timestamp; returns (sent, failed).
+
+    A booking whose message fails is released again for the next run. If
+    the process dies between claiming and sending, that batch is skipped
+    rather than risk sending it twice.
+    """
+    templates = {}
+    sent = failed = 0
+    connection = get_connection()
+    connection.open()
+    try:
+        for start in range(0, len(bookings), batch_size):
+            if start and pause:
+                time.sleep(pause)
+
+            released = []
+            for booking in _claim(bookings[start:start + batch_size], claim_field):
+                key = (booking.session_id, booking.language)
+                if key not in templates:
+                    templates[key] = ReminderTemplate(booking.session, booking.language, name)
+                try:
+                    templates[key].message(booking, connection).send()
+                    sent += 1
+                except Exception as e:
+                    log(f"✗ Email to {booking.booking_reference} ({name}) failed: {e}")
+                    released.append(booking.pk)
+                    failed += 1
+
+            if released:
+                Booking.objects.filter(pk__in=released).update(**{claim_field: None})
+    finally:
+        connection.close()
+    return sent, failed
@@ -0,0 +1,233 @@
+"""
+Daily booking rollups for reporting.
+
+    refresh_rollups([session.id])     # after that session's bookings changed
+    rebuild_rollups()                 # nightly, from scratch
+    session_report(date_from, date_to)
+
+A BookingRollup row holds the counts and money of one (session, ticket
+type, day the bookings were made), so a report over years of history
+reads a few rows per session instead of every booking.
+
+The rollups follow booking changes: saving or deleting a booking, and
+every state transition (events.states), refreshes the rollups of the
+sessions involved once the transaction commits - one grouped aggregate
+over those sessions' bookings (indexed by session) and a replace of their
+rows. Saving a session refreshes its own, which copy its date and event.
+The nightly rebuild recomputes everything, which also repairs
+changes made around these paths (a queryset.update() in a shell, a
+booking moved to another session in the admin).
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.dispatch import Signal
+
+from .exports import session_names
+from .models import Booking, BookingRollup, GameSession, TicketType
+
+# Booking fields the rollups are computed from
+ROLLUP_FIELDS = {
+    'session', 'ticket_type', 'participants', 'total_price', 'status', 'is_confirmed',
+    'payment_status', 'created_at',
+}
+
+# sender=BookingRollup, delta=<change in confirmed seats>; sent by
+# refresh_rollups (not by rebuild_rollups)
+seats_changed = Signal()
+
+TOTALS = ('bookings', 'confirmed', 'cancelled', 'seats', 'revenue', 'refunded')
+
+
+def _money(expression):
+    return Coalesce(expression, Value(Decimal('0')), output_field=DecimalField(max_digits=10, decimal_places=2))
+
+
+def _rollups(bookings):
+    """Unsaved BookingRollup rows for a queryset of bookings, from one grouped query."""
+    rows = (
+        bookings
+        .annotate(day=TruncDate('created_at'))
+        .values('session_id', 'ticket_type_id', 'day', 'session__date', 'session__event_id')
+        .annotate(
+            bookings=Count('pk'),
+            confirmed=Count('pk', filter=Q(is_confirmed=True)),
+            cancelled=Count('pk', filter=Q(status='cancelled')),
+            seats=Coalesce(Sum('participants', filter=Q(is_confirmed=True)), 0),
+            revenue=_money(Sum('total_price', filter=Q(payment_status='completed'))),
+            refunded=_money(Sum('total_price', filter=Q(payment_status='refunded'))),
+        )
+        .order_by()
+    )
+    for row in rows.iterator():
+        yield BookingRollup(
+            session_id=row['session_id'],
+            ticket_type_id=row['ticket_type_id'],
+            day=row['day'],
+            session_date=row['session__date'],
+            event_id=row['session__event_id'],
+            **{total: row[total] for total in TOTALS},
+        )
+
+
+def refresh_rollups(session_ids):
+    """Recompute the rollups of some sessions."""
+    session_ids = set(session_ids)
+    if not session_ids:
+        return
+    with transaction.atomic():
+        # Lock the sessions before reading their bookings, so of two
+        # refreshes of the same session the later one also reads later and
+        # its rows win. A write, too, because SQLite waits its turn for a
+        # write but fails at once when a transaction that has read tries to
+        # start writing while another one is
+        GameSession.objects.filter(pk__in=session_ids).update(max_participants=F('max_participants'))
+        rollups = list(_rollups(Booking.objects.filter(session_id__in=session_ids)))
+        previous = BookingRollup.objects.filter(session_id__in=session_ids)
+        seats_before = previous.aggregate(seats=Coalesce(Sum('seats'), 0))['seats']
+        previous.delete()
+        BookingRollup.objects.bulk_create(rollups)
+    seats = sum(rollup.seats for rollup in rollups) - seats_before
+    if seats:
+        seats_changed.send(sender=BookingRollup, delta=seats)
+
+
+def rebuild_rollups(batch_size=1000):
+    """Recompute every rollup; returns the number of rows. Readers see the old or the new set, never half."""
+    count = 0
+    with transaction.atomic():
+        BookingRollup.objects.all().delete()
+        batch = []
+        for rollup in _rollups(Booking.objects.all()):
+            batch.append(rollup)
+            if len(batch) >= batch_size:
+                BookingRollup.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        BookingRollup.objects.bulk_create(batch)
+        count += len(batch)
+    return count
+
+
+# ── Keeping them current ─────────────────────────────────────────────────────
+
+def _refresh_after_commit(session_ids):
+    session_ids = set(session_ids)
+    transaction.on_commit(lambda: refresh_rollups(session_ids))
+
+
+def booking_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not ROLLUP_FIELDS.intersection(update_fields):
+        return
+    _refresh_after_commit([instance.session_id])
+
+
+def booking_deleted(sender, instance, **kwargs):
+    _refresh_after_commit([instance.session_id])
+
+
+def session_saved(sender, instance, created, **kwargs):
+    # The rows copy the session's date and event; it may have been
+    # rescheduled or moved to another event
+    if not created:
+        _refresh_after_commit([instance.pk])
+
+
+def booking_transitioned(sender, bookings, **kwargs):
+    if isinstance(bookings, list):
+        session_ids = [booking.session_id for booking in bookings]
+    else:
+        session_ids = bookings.order_by().values_list('session_id', flat=True).distinct()
+    _refresh_after_commit(session_ids)
+
+
+# ── Reports ───────────────────────────────────────────────────────────────────
+
+def _filtered(date_field, date_from=None, date_to=None, event_id=None):
+    rollups = BookingRollup.objects.all()
+    if date_from:
+        rollups = rollups.filter(**{f'{date_field}__gte': date_from})
+    if date_to:
+        rollups = rollups.filter(**{f'{date_field}__lte': date_to})
+    if event_id:
+        rollups = rollups.filter(event_id=event_id)
+    return rollups
+
+
+def _totals():
+    return {total: Sum(total) for total in TOTALS}
+
+
+def session_report(date_from=None, date_to=None, event_id=None):
+    """Occupancy and money per session held between the dates."""
+    rollups = _filtered('session_date', date_from, date_to, event_id)
+    rows = list(
+        rollups.values('session_id', 'session_date').annotate(**_totals()).order_by('session_date', 'session_id')
+    )
+    names = session_names(rollups)
+    sessions = dict(
+        (pk, (start_time, capacity))
+        for pk, start_time, capacity in GameSession.objects.filter(
+            pk__in=[row['session_id'] for row in rows],
+        ).values_list('pk', 'start_time', 'max_participants')
+    )
+    for row in rows:
+        start_time, capacity = sessions[row['session_id']]
+        row['name'] = names.get(row['session_id'], '')
+        row['start_time'] = start_time
+        row['capacity'] = capacity
+        row['occupancy'] = round(100 * row['seats'] / capacity) if capacity else None
+    rows.sort(key=lambda row: (row['session_date'], row['start_time'], row['session_id']))
+    return rows
+
+
+def ticket_type_report(date_from=None, date_to=None, event_id=None):
+    """Sales per ticket type for bookings made between the dates."""
+    rows = list(
+        _filtered('day', date_from, date_to, event_id)
+        .values('ticket_type_id').annotate(**_totals()).order_by('-revenue')
+    )
+    ticket_types = {
+        ticket_type.pk: ticket_type
+        for ticket_type in TicketType.objects.select_related('event').filter(
+            pk__in=[row['ticket_type_id'] for row in rows if row['ticket_type_id']],
+        )
+    }
+    for row in rows:
+        ticket_type = ticket_types.get(row['ticket_type_id'])
+        row['name'] = ticket_type.name if ticket_type else 'Per person (no ticket type)'
+        row['event'] = ticket_type.event.name if ticket_type else ''
+    return rows
+
+
+def daily_report(date_from=None, date_to=None, event_id=None):
+    """Sales per day bookings were made."""
+    return list(_filtered('day', date_from, date_to, event_id).values('day').annotate(**_totals()).order_by('day'))
+
+
+REPORTS = {
+    # name: (report, [(header, key), ...])
+    'sessions': (session_report, [
+        ('Date', 'session_date'), ('Start', 'start_time'), ('Session', 'name'), ('Bookings', 'bookings'),
+        ('Confirmed', 'confirmed'), ('Cancelled', 'cancelled'), ('Seats', 'seats'), ('Capacity', 'capacity'),
+        ('Occupancy %', 'occupancy'), ('Revenue (EUR)', 'revenue'), ('Refunded (EUR)', 'refunded'),
+    ]),
+    'ticket_types': (ticket_type_report, [
+        ('Event', 'event'), ('Ticket type', 'name'), ('Bookings', 'bookings'), ('Confirmed', 'confirmed'),
+        ('Cancelled', 'cancelled'), ('Seats', 'seats'), ('Revenue (EUR)', 'revenue'), ('Refunded (EUR)', 'refunded'),
+    ]),
+    'daily': (daily_report, [
+        ('Day', 'day'), ('Bookings', 'bookings'), ('Confirmed', 'confirmed'), ('Cancelled', 'cancelled'),
+        ('Seats', 'seats'), ('Revenue (EUR)', 'revenue'), ('Refunded (EUR)', 'refunded'),
+    ]),
+}
+
+
+def report_rows(name, **filters):
+    """Header row, then one row per line of the named report (for export_response)."""
+    report, columns = REPORTS[name]
+    yield [header for header, _key in columns]
+    for row in report(**filters):
+        yield [row[key] for _header, key in columns]
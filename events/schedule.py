@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+
+from core.cache import bump_content_version
+from core.purge import purge_content_groups
+from .models import GameSession
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+
+def occurrence_dates(start_date, end_date, weekdays=None, interval=1, exclude=()):
+    """
+    Dates between start_date and end_date (inclusive) matching a simple
+    RRULE-style weekly recurrence.
+
+    weekdays  -- weekday numbers (Monday = 0); None means every day
+    interval  -- repeat every N weeks, counted from start_date's week
+    exclude   -- dates to leave out (holidays, venue closures)
+    """
+    if interval < 1:
+        raise ValueError("interval must be at least 1")
+    exclude = set(exclude)
+    first_monday = start_date - timedelta(days=start_date.weekday())
+
+    dates = []
+    day = start_date
+    while day <= end_date:
+        week_index = (day - first_monday).days // 7
+        if (
+            week_index % interval == 0
+            and (weekdays is None or day.weekday() in weekdays)
+            and day not in exclude
+        ):
+            dates.append(day)
+        day += timedelta(days=1)
+    return dates
+
+
+def find_conflicts(dates, start_time, end_time, allow_overlap=False):
+    """
+    Dates already holding a session that clashes with [start_time, end_time),
+    in one query. An identical start time always clashes (date and start_time
+    are unique together); overlapping times clash unless allow_overlap.
+    """
+    if not dates:
+        return set()
+    clash = Q(start_time=start_time)
+    if not allow_overlap:
+        clash |= Q(start_time__lt=end_time, end_time__gt=start_time)
+    return set(
+        GameSession.objects
+        .filter(clash, date__range=(min(dates), max(dates)))
+        .values_list('date', flat=True)
+        .distinct()
+    ) & set(dates)
+
+
+def create_sessions(dates, start_time, end_time, translations, event=None,
+                    batch_size=500, **fields):
+    """
+    Insert one GameSession per date together with its translation rows
+    using batched bulk_create, in a single transaction.
+
+    translations -- {language_code: {'name': ..., 'description': ..., 'button': ...}}
+    fields       -- any other GameSession fields (max_participants, price_per_person, ...)
+
+    Returns the created sessions.
+    """
+    translation_model = GameSession._parler_meta.root_model
+
+    with transaction.atomic():
+        sessions = GameSession.objects.bulk_create(
+            [
+                GameSession(
+                    event=event,
+                    date=date,
+                    start_time=start_time,
+                    end_time=end_time,
+                    **fields,
+                )
+                for date in dates
+            ],
+            batch_size=batch_size,
+        )
+
+        # Backends without RETURNING leave pk unset; look the rows up again
+        if any(session.pk is None for session in sessions):
+            ids = dict(
+                GameSession.objects
+                .filter(date__in=dates, start_time=start_time)
+                .values_list('date', 'id')
+            )
+            for session in sessions:
+                session.pk = ids[session.date]
+
+        translation_model.objects.bulk_create(
+            [
+                translation_model(master_id=session.pk, language_code=language_code, **values)
+                for session in sessions
+                for language_code, values in translations.items()
+            ],
+            batch_size=batch_size,
+        )
+
+    # bulk_create sends no post_save signals
+    bump_content_version('sessions', 'home')
+    purge_content_groups('sessions', 'home')
+    return sessions
@@ -0,0 +1,126 @@
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+from django.shortcuts import get_object_or_404
+
+from core.translations import prefetch_translations
+from .inventory import tickets_left
+from .models import GameSession, TicketType
+
+
+def with_availability(queryset):
+    """Annotate confirmed participants so available_spots needs no extra query."""
+    return queryset.annotate(
+        booked_participants=Coalesce(
+            Sum('bookings__participants', filter=Q(bookings__is_confirmed=True)), 0
+        )
+    )
+
+
+def group_sessions(sessions):
+    """
+    Split an ordered list of sessions into event cards and standalone sessions
+    in a single pass.
+
+    Each card is the session's Event with ``upcoming_sessions`` (in the given
+    order) and ``active_ticket_types`` attached, and each of its sessions
+    gets ``ticket_availability`` (see attach_ticket_availability). Cards
+    come out ordered by their earliest session. Sessions of inactive events
+    are dropped, like the event list they would have belonged to.
+
+    Costs one query, for the ticket types of all events on the page, and
+    one more if any of them is limited.
+    """
+    cards = {}
+    standalone_sessions = []
+    for session in sessions:
+        if session.event_id is None:
+            standalone_sessions.append(session)
+            continue
+        event = cards.get(session.event_id)
+        if event is None:
+            if not session.event.is_active:
+                continue
+            event = session.event
+            event.upcoming_sessions = []
+            cards[session.event_id] = event
+        event.upcoming_sessions.append(session)
+
+    ticket_types = attach_ticket_availability(
+        [session for event in cards.values() for session in event.upcoming_sessions]
+    )
+    for event_id, event in cards.items():
+        event.active_ticket_types = ticket_types.get(event_id, [])
+
+    return list(cards.values()), standalone_sessions
+
+
+def attach_ticket_availability(sessions):
+    """
+    Set ``ticket_availability`` on each session: a list of
+    {'ticket_type', 'tickets_left'} for its event's active ticket types,
+    where tickets_left is None for types without a limit. Returns
+    {event id: [active ticket types]}.
+
+    One query for the ticket types, one more if any of them is limited.
+    """
+    ticket_types = {}
+    event_ids = {session.event_id for session in sessions if session.event_id}
+    if event_ids:
+        for ticket_type in TicketType.objects.filter(event_id__in=event_ids, is_active=True):
+            ticket_types.setdefault(ticket_type.event_id, []).append(ticket_type)
+
+    left = tickets_left(
+        (session.pk, ticket_type)
+        for session in sessions
+        for ticket_type in ticket_types.get(session.event_id, [])
+    )
+    for session in sessions:
+        session.ticket_availability = [
+            {'ticket_type': ticket_type, 'tickets_left': left.get((session.pk, ticket_type.pk))}
+            for ticket_type in ticket_types.get(session.event_id, [])
+        ]
+    return ticket_types
+
+
+class BookingContext:
+    """
+    Everything book_session needs to know about a session, loaded once per
+    request and shared by the view, BookingForm and _finalize_booking:
+    the session with its event and translations, its active ticket types
+    (each with ``tickets_left``, None if unlimited) and its current
+    availability. Three queries in total, four if a ticket type is limited.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.ticket_types = (
+            list(TicketType.objects.filter(event_id=session.event_id, is_active=True))
+            if session.event_id else []
+        )
+        left = tickets_left((session.pk, ticket_type) for ticket_type in self.ticket_types)
+        for ticket_type in self.ticket_types:
+            ticket_type.tickets_left = left.get((session.pk, ticket_type.pk))
+        # Annotated by with_availability(), so no extra query
+        self.available_spots = session.available_spots
+
+    @classmethod
+    def for_session(cls, session_id):
+        queryset = with_availability(
+            prefetch_translations(GameSession.objects.select_related('event'))
+        )
+        return cls(get_object_or_404(queryset, id=session_id, is_active=True))
+
+    @property
+    def has_ticket_types(self):
+        return bool(self.ticket_types)
+
+    @property
+    def is_full(self):
+        return self.available_spots == 0
+
+    def get_ticket_type(self, ticket_type_id):
+        """Return the active ticket type with this id, or None."""
+        for ticket_type in self.ticket_types:
+            if str(ticket_type.id) == str(ticket_type_id):
+                return ticket_type
+        return None
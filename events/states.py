@@ -0,0 +1,122 @@
+"""
+Booking state changes.
+
+    transition(booking, 'mark_paid', payment_method='card', payment_completed_at=now)
+    updated, bookings = transition_queryset(Booking.objects.filter(pk__in=ids), 'expire')
+
+A booking's state is its status, is_confirmed and payment_status together;
+every change between states goes through one of TRANSITIONS, which names
+the states it may start from and the fields it sets. The change is one
+conditional UPDATE (WHERE status IN (...) AND ...) of just those columns
+plus updated_at, so it neither re-runs Booking.save() nor overwrites a
+concurrent change: of two webhooks racing to mark a booking paid, only one
+wins, and the other gets TransitionNotAllowed.
+
+Every applied transition sends booking_transitioned, which is how the rest
+of the site (cached pages, ...) hears about status changes.
+"""
+from django.db.models import Q
+from django.dispatch import Signal
+from django.utils import timezone
+
+from core.cache import bump_content_version
+from core.purge import purge_content_groups
+from .models import Booking
+
+# sender=Booking, transition=<Transition>, bookings=<the bookings that changed>
+booking_transitioned = Signal()
+
+OPEN = ('pending', 'confirmed')
+UNPAID = ('pending', 'processing', 'failed')
+
+
+class TransitionNotAllowed(Exception):
+    """The booking is not (or no longer) in a state the transition starts from."""
+
+
+class Transition:
+    def __init__(self, name, source, target):
+        self.name = name
+        # {field: allowed values}
+        self.source = source
+        # {field: new value}
+        self.target = target
+
+    def allows(self, booking):
+        return all(getattr(booking, field) in values for field, values in self.source.items())
+
+    @property
+    def condition(self):
+        return Q(**{f'{field}__in': values for field, values in self.source.items()})
+
+    def __str__(self):
+        return self.name
+
+
+TRANSITIONS = {transition.name: transition for transition in [
+    # Nothing to pay
+    Transition('confirm_free', {'status': ('pending',), 'payment_status': UNPAID},
+               {'status': 'confirmed', 'is_confirmed': True, 'payment_status': 'completed'}),
+    # Pay at the event; the seat is held from now on
+    Transition('confirm_cash', {'status': OPEN, 'payment_status': UNPAID},
+               {'status': 'confirmed', 'is_confirmed': True, 'payment_status': 'pending', 'payment_method': 'cash'}),
+    # Paid online (webhooks); also settles a booking confirmed for cash
+    Transition('mark_paid', {'status': OPEN, 'payment_status': UNPAID},
+               {'status': 'confirmed', 'is_confirmed': True, 'payment_status': 'completed'}),
+    # Never confirmed or paid (events.reaper)
+    Transition('expire', {'status': ('pending',), 'is_confirmed': (False,), 'payment_status': ('pending', 'processing')},
+               {'status': 'cancelled'}),
+    # Cancelled by us (events.cancellations)
+    Transition('cancel', {'status': OPEN},
+               {'status': 'cancelled', 'is_confirmed': False}),
+    Transition('refund', {'status': OPEN, 'payment_status': ('pending', 'processing', 'completed')},
+               {'status': 'cancelled', 'is_confirmed': False, 'payment_status': 'refunded'}),
+    # Paid after it was cancelled (an old payment page); refunded by the webhook
+    Transition('refund_cancelled', {'status': ('cancelled',), 'payment_status': UNPAID},
+               {'payment_status': 'refunded'}),
+]}
+
+
+def transition(booking, name, **changes):
+    """
+    Apply a transition to one booking, plus any extra field changes, and
+    update the instance to match.
+    """
+    t = TRANSITIONS[name]
+    if not t.allows(booking):
+        raise TransitionNotAllowed(
+            f"Can't {t} booking {booking.booking_reference} "
+            f"({booking.status}, payment {booking.payment_status})"
+        )
+    values = {**t.target, **changes, 'updated_at': timezone.now()}
+    if not Booking.objects.filter(t.condition, pk=booking.pk).update(**values):
+        raise TransitionNotAllowed(f"Booking {booking.booking_reference} was changed by someone else")
+    for field, value in values.items():
+        setattr(booking, field, value)
+    booking_transitioned.send(sender=Booking, transition=t, bookings=[booking])
+    return booking
+
+
+def transition_queryset(queryset, name, **changes):
+    """
+    Apply a transition to every booking in queryset that is in one of its
+    source states; changes may use expressions (F, Case, ...).
+
+    Select the bookings by id, not by state: the changed rows are found
+    again through the same queryset. Returns (number changed, the changed
+    bookings as a queryset).
+    """
+    t = TRANSITIONS[name]
+    now = timezone.now()
+    updated = queryset.filter(t.condition).update(**t.target, **changes, updated_at=now)
+    changed = queryset.filter(updated_at=now, **t.target)
+    if updated:
+        booking_transitioned.send(sender=Booking, transition=t, bookings=changed)
+    return updated, changed
+
+
+def refresh_cached_pages(sender, **kwargs):
+    """Availability shown on the sessions and home pages changes with booking states."""
+    # These UPDATEs bypass the post_save handlers that do this for other saves
+    bump_content_version('sessions', 'home')
+    purge_content_groups('sessions', 'home')
@@ -1,3 +1,534 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from unittest import mock
 
-# Create your tests here.
+import requests
+import stripe
+
+from django.contrib.auth.models import User
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import checkin, rollups as rollups_module
+from .admin import GameSessionAdmin
+from .cancellations import cancel_sessions
+from .exports import csv_stream
+from .inventory import take_tickets, tickets_left
+from .models import Booking, BookingRollup, Event, GameSession, TicketStock, TicketType
+from .payments import PaymentError, PayPalProvider, StripeProvider
+from .states import transition
+
+
+def make_session(event=None, days=7, start=18, **fields):
+    session = GameSession(
+        event=event,
+        date=timezone.localdate() + datetime.timedelta(days=days),
+        start_time=datetime.time(start),
+        end_time=datetime.time(start + 2),
+        max_participants=100,
+        price_per_person=5,
+        address='Ilica 1',
+        city='Zagreb',
+        **fields,
+    )
+    session.set_current_language('en')
+    session.name = 'Escape room'
+    session.save()
+    return session
+
+
+def make_booking(session, email='customer@example.com', **fields):
+    return Booking.objects.create(
+        session=session, customer_name='Customer', customer_email=email, participants=2, **fields,
+    )
+
+
+@override_settings(RATELIMIT_ENABLED=False)
+class TicketStockTests(TransactionTestCase):
+    def setUp(self):
+        event = Event.objects.create(name='Escape night')
+        self.family = TicketType.objects.create(
+            event=event, name='Family', price=20, participant_count=4, per_session_limit=3,
+        )
+        self.session = make_session(event)
+
+    def book(self, client, email, quantity=1):
+        return client.post(f'/en/book/{self.session.pk}/', {
+            'customer_name': 'Customer',
+            'customer_email': email,
+            'customer_phone': '',
+            'participants': 1,
+            'special_requests': '',
+            'ticket_type_id': self.family.pk,
+            'ticket_quantity': quantity,
+        })
+
+    def left(self):
+        return tickets_left([(self.session.pk, self.family)])[self.session.pk, self.family.pk]
+
+    def test_concurrent_bookings_never_oversell(self):
+        customers = 8
+        start = threading.Barrier(customers)
+        statuses = []
+
+        def customer(number):
+            try:
+                client = Client()
+                start.wait()
+                statuses.append(self.book(client, f'customer{number}@example.com').status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=customer, args=(number,)) for number in range(customers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Winners are redirected to payment; the rest see the form again
+        self.assertEqual(statuses.count(302), 3)
+        self.assertEqual(statuses.count(200), customers - 3)
+        self.assertEqual(Booking.objects.filter(ticket_type=self.family).count(), 3)
+        self.assertEqual(TicketStock.objects.get(session=self.session, ticket_type=self.family).sold, 3)
+        self.assertEqual(self.left(), 0)
+
+    def test_more_than_left_is_refused(self):
+        self.assertEqual(self.book(Client(), 'a@example.com', quantity=2).status_code, 302)
+        response = self.book(Client(), 'b@example.com', quantity=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Only 1 Family tickets are left')
+        self.assertEqual(self.left(), 1)
+
+    def test_cancelled_bookings_return_their_tickets(self):
+        self.book(Client(), 'a@example.com', quantity=3)
+        booking = Booking.objects.get(customer_email='a@example.com')
+        self.assertEqual(self.left(), 0)
+
+        transition(booking, 'cancel')
+        self.assertEqual(self.left(), 3)
+        self.assertEqual(self.book(Client(), 'b@example.com', quantity=3).status_code, 302)
+
+    def test_quantity_must_be_a_whole_number_of_at_least_one(self):
+        for quantity in ('0', '-2', 'two', ''):
+            with self.subTest(quantity=quantity):
+                response = self.book(Client(), 'a@example.com', quantity=quantity)
+                self.assertContains(response, 'Please choose at least one ticket.')
+        self.assertFalse(Booking.objects.exists())
+        self.assertEqual(self.left(), 3)
+
+        with self.assertRaises(ValueError):
+            take_tickets(self.session.pk, self.family, 0)
+
+    def test_limit_counts_bookings_made_before_it_was_set(self):
+        self.family.per_session_limit = None
+        self.family.save()
+        self.book(Client(), 'a@example.com', quantity=2)
+
+        self.family.per_session_limit = 3
+        self.family.save()
+        self.assertEqual(self.left(), 1)
+        self.assertEqual(self.book(Client(), 'b@example.com', quantity=2).status_code, 200)
+        self.assertEqual(self.book(Client(), 'c@example.com', quantity=1).status_code, 302)
+        self.assertEqual(self.left(), 0)
+
+
+
+@override_settings(RATELIMIT_ENABLED=False)
+class BookingQueryTests(TestCase):
+    def book(self, session, **fields):
+        return self.client.post(f'/en/book/{session.pk}/', {
+            'customer_name': 'Customer',
+            'customer_email': 'customer@example.com',
+            'customer_phone': '',
+            'participants': 2,
+            'special_requests': '',
+            'submission_token': uuid.uuid4(),
+            **fields,
+        })
+
+    def test_ticket_type_booking(self):
+        event = Event.objects.create(name='Escape night')
+        adult = TicketType.objects.create(event=event, name='Adult', price=20, participant_count=1)
+        session = make_session(event)
+        # Resubmission check, session, its translation, ticket types; the
+        # insert (in a savepoint here, as the test runs in a transaction)
+        with self.assertNumQueries(7):
+            response = self.book(session, ticket_type_id=adult.pk, ticket_quantity=2)
+        self.assertEqual(response.status_code, 302)
+
+    def test_legacy_booking(self):
+        session = make_session()
+        # As above, without ticket types
+        with self.assertNumQueries(6):
+            response = self.book(session)
+        self.assertEqual(response.status_code, 302)
+
+
+class AdminChangelistTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.rows = 0
+
+    def add_rows(self, count):
+        """count events, each with a ticket type and a session with one booking."""
+        for number in range(self.rows, self.rows + count):
+            event = Event.objects.create(name=f'Event {number}')
+            ticket_type = TicketType.objects.create(event=event, name='Adult', price=5, participant_count=1)
+            make_booking(make_session(event, days=number + 1), ticket_type=ticket_type)
+        self.rows += count
+
+    def assert_changelist_queries(self, url, queries):
+        # The same count for a page of 3 rows and a page of 20
+        for rows in (3, 20):
+            self.add_rows(rows - self.rows)
+            with self.subTest(rows=rows), self.assertNumQueries(queries):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_event_changelist(self):
+        self.assert_changelist_queries('/admin/events/event/', 7)
+
+    def test_session_changelist(self):
+        self.assert_changelist_queries('/admin/events/gamesession/', 12)
+
+    def test_booking_changelist(self):
+        self.assert_changelist_queries('/admin/events/booking/', 9)
+
+    def test_sessions_sort_by_available_spots(self):
+        self.add_rows(3)
+        sessions = list(GameSession.objects.order_by('date'))
+        Booking.objects.filter(session=sessions[0]).update(is_confirmed=True, participants=50)
+        Booking.objects.filter(session=sessions[2]).update(is_confirmed=True, participants=10)
+        # Columns are numbered after the action checkbox
+        column = GameSessionAdmin.list_display.index('available_spots') + 1
+
+        response = self.client.get('/admin/events/gamesession/', {'o': column})
+        self.assertEqual([session.pk for session in response.context['cl'].result_list],
+                         [sessions[0].pk, sessions[2].pk, sessions[1].pk])
+
+
+@override_settings(RATELIMIT_ENABLED=False)
+@mock.patch('events.models.get_provider')
+class StripeIntentTests(TestCase):
+    def setUp(self):
+        self.session = make_session()
+
+    def stripe(self, get_provider):
+        stripe = get_provider.return_value
+        stripe.enabled = True
+        stripe.create_intent.side_effect = lambda **kwargs: {
+            'id': f'pi_{stripe.create_intent.call_count}',
+            'client_secret': f'pi_{stripe.create_intent.call_count}_secret',
+            'status': 'requires_payment_method',
+        }
+        stripe.retrieve_intent.side_effect = lambda intent_id: {
+            'id': intent_id, 'client_secret': f'{intent_id}_secret', 'status': 'requires_payment_method',
+        }
+        return stripe
+
+    def book(self):
+        response = self.client.post(f'/en/book/{self.session.pk}/', {
+            'customer_name': 'Customer',
+            'customer_email': 'customer@example.com',
+            'customer_phone': '',
+            'participants': 2,
+            'special_requests': '',
+        })
+        booking = Booking.objects.get()
+        self.assertRedirects(response, f'/en/payment/{booking.access_token}/', fetch_redirect_response=False)
+        return booking
+
+    def card_submit(self, booking):
+        return self.client.post(f'/en/payment/{booking.access_token}/intent/').json()['client_secret']
+
+    def test_booking_and_page_loads_call_no_stripe(self, get_provider):
+        booking = self.book()
+        for _load in range(3):
+            self.assertEqual(self.client.get(f'/en/payment/{booking.access_token}/').status_code, 200)
+        get_provider.assert_not_called()
+
+    def test_first_card_submit_creates_one_intent(self, get_provider):
+        stripe = self.stripe(get_provider)
+        booking = self.book()
+        self.assertEqual([self.card_submit(booking) for _submit in range(3)], ['pi_1_secret'] * 3)
+        stripe.create_intent.assert_called_once()
+        stripe.retrieve_intent.assert_not_called()
+
+        # The page renders the stored secret from now on
+        response = self.client.get(f'/en/payment/{booking.access_token}/')
+        self.assertEqual(response.context['client_secret'], 'pi_1_secret')
+        self.assertEqual(stripe.create_intent.call_count, 1)
+
+    def test_stale_intent_is_retrieved_once(self, get_provider):
+        stripe = self.stripe(get_provider)
+        booking = make_booking(self.session, stripe_payment_intent_id='pi_old', stripe_intent_status='processing',
+                               stripe_client_secret='pi_old_secret',
+                               stripe_intent_synced_at=timezone.now() - datetime.timedelta(minutes=11))
+        self.assertEqual([self.card_submit(booking) for _submit in range(2)], ['pi_old_secret'] * 2)
+        stripe.retrieve_intent.assert_called_once_with('pi_old')
+        stripe.create_intent.assert_not_called()
+
+    def test_intent_from_before_local_storage_is_retrieved_once(self, get_provider):
+        stripe = self.stripe(get_provider)
+        booking = make_booking(self.session, stripe_payment_intent_id='pi_old')
+        self.assertEqual(self.card_submit(booking), 'pi_old_secret')
+        stripe.retrieve_intent.assert_called_once_with('pi_old')
+        stripe.create_intent.assert_not_called()
+
+    def test_cancelled_intent_is_replaced(self, get_provider):
+        stripe = self.stripe(get_provider)
+        booking = make_booking(self.session, stripe_payment_intent_id='pi_old', stripe_intent_status='canceled',
+                               stripe_client_secret='pi_old_secret', stripe_intent_synced_at=timezone.now())
+        self.assertEqual(self.card_submit(booking), 'pi_1_secret')
+        stripe.create_intent.assert_called_once()
+        self.assertIn('-intent-pi_old-', stripe.create_intent.call_args.kwargs['idempotency_key'])
+        booking.refresh_from_db()
+        self.assertEqual(booking.stripe_payment_intent_id, 'pi_1')
+
+    def test_cash_creates_no_intent(self, get_provider):
+        booking = self.book()
+        response = self.client.post(f'/en/payment/{booking.access_token}/', {'payment_method': 'cash'})
+        self.assertRedirects(response, f'/en/booking-success/{booking.access_token}/', fetch_redirect_response=False)
+        get_provider.assert_not_called()
+        booking.refresh_from_db()
+        self.assertEqual(booking.stripe_payment_intent_id, '')
+
+
+class CsvExportTests(SimpleTestCase):
+    def cells(self, rows):
+        lines = ''.join(csv_stream(rows)).lstrip('\ufeff')
+        return list(csv.reader(io.StringIO(lines)))[1:]
+
+    def test_formula_prefixes_are_quoted(self):
+        names = ['=1+1', '+cmd', '-2+3', '-1', '@SUM(A1)', '\t=1', '\r=1', 'Ana']
+        self.assertEqual(self.cells([['Name']] + [[name] for name in names]),
+                         [["'" + name] for name in names[:-1]] + [['Ana']])
+
+    def test_phone_numbers_are_left_alone_in_the_phone_column_only(self):
+        rows = [
+            ['Name', 'Phone'],
+            ['+385 91 234 5678', '+385 91 234 5678'],
+            ['Ana', '+1 (555) 010-0000'],
+            ['Ana', '+1+cmd|calc'],
+            ['Ana', '=HYPERLINK("x")'],
+        ]
+        self.assertEqual(self.cells(rows), [
+            ["'+385 91 234 5678", '+385 91 234 5678'],
+            ['Ana', '+1 (555) 010-0000'],
+            ['Ana', "'+1+cmd|calc"],
+            ['Ana', '\'=HYPERLINK("x")'],
+        ])
+
+
+@mock.patch('events.cancellations.get_provider')
+class CancelSessionsTests(TestCase):
+    def test_only_bookings_paid_another_way_this_run_are_refunded_by_hand(self, get_provider):
+        get_provider.return_value.enabled = False
+        session = make_session()
+        cash = make_booking(session, payment_status='completed', payment_method='cash')
+        unpaid = make_booking(session)
+        # Cancelled by an earlier run
+        earlier = make_booking(session, payment_status='completed', payment_method='paypal')
+        transition(earlier, 'cancel', cancelled_at=timezone.now())
+        GameSession.objects.filter(pk=session.pk).update(price_per_person=0)
+        free = make_booking(GameSession.objects.get(pk=session.pk), payment_status='completed', payment_method='cash')
+
+        cancelled, refunded, manual, failed = cancel_sessions(GameSession.objects.filter(pk=session.pk), log=str)
+        self.assertEqual((cancelled, refunded, manual, failed), (3, 0, [cash.booking_reference], 0))
+        for booking in (cash, unpaid, free):
+            booking.refresh_from_db()
+            self.assertEqual(booking.status, 'cancelled')
+        get_provider.return_value.refund.assert_not_called()
+
+
+class CheckInManyTests(TestCase):
+    def setUp(self):
+        self.session = make_session()
+        self.booking = make_booking(self.session, is_confirmed=True)
+
+    def test_outcomes_are_keyed_by_the_token_as_sent(self):
+        raw_token = f' {str(self.booking.access_token).upper()} '
+        outcomes = checkin.check_in_many([(raw_token, None), ('not-a-token', None)], session_id=self.session.pk)
+        self.assertEqual(outcomes, {raw_token: checkin.CHECKED_IN, 'not-a-token': checkin.UNKNOWN})
+
+    def test_booking_checked_in_meanwhile_by_another_device(self):
+        outcome = checkin._outcome
+
+        def checked_in_elsewhere(booking, session_id):
+            # Another device admits the booking between the lookup and the UPDATE
+            Booking.objects.filter(pk=booking.pk).update(checked_in_at=timezone.now())
+            return outcome(booking, session_id)
+
+        token = str(self.booking.access_token)
+        with mock.patch.object(checkin, '_outcome', checked_in_elsewhere):
+            outcomes = checkin.check_in_many([(token, None)])
+        self.assertEqual(outcomes, {token: checkin.ALREADY_CHECKED_IN})
+
+    def test_scan_times_that_are_not_times_count_as_now(self):
+        now = timezone.now()
+        for scanned_at in (1700000000, 17.5, ['2024-01-01'], {'at': 1}, 'yesterday', None):
+            self.assertEqual(checkin._scan_time(scanned_at, now), now)
+
+    def test_sync_with_a_numeric_scan_time(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        token = str(self.booking.access_token)
+        response = self.client.post('/en/checkin/sync/', {'session': self.session.pk, 'scans': [[token, 1700000000]]},
+                                    content_type='application/json')
+        self.assertEqual(response.json(), {'outcomes': {token: checkin.CHECKED_IN}})
+
+
+@mock.patch('events.payments.time.sleep')
+class ProviderCallTests(SimpleTestCase):
+    def fail(self, error):
+        def fn():
+            raise error
+        return fn
+
+    def test_refusals_become_payment_errors(self, sleep):
+        with self.assertRaises(PaymentError):
+            StripeProvider().call('test', self.fail(stripe.InvalidRequestError('No such intent', 'intent')))
+        response = requests.Response()
+        response.status_code = 422
+        with self.assertRaises(PaymentError):
+            PayPalProvider().call('test', self.fail(requests.HTTPError(response=response)))
+
+    def test_bugs_propagate_as_they_are(self, sleep):
+        for provider in (StripeProvider(), PayPalProvider()):
+            with self.subTest(provider=provider.name), self.assertRaises(KeyError):
+                provider.call('test', self.fail(KeyError('id')))
+            self.assertEqual(provider.breaker.state, 'closed')
+        sleep.assert_not_called()
+
+    def test_a_bug_in_the_trial_call_does_not_hold_the_circuit(self, sleep):
+        provider = StripeProvider()
+        provider.breaker.opened_at = 0
+        with self.assertRaises(KeyError):
+            provider.call('test', self.fail(KeyError('id')))
+        self.assertEqual(provider.call('test', lambda: 'ok'), 'ok')
+
+
+class RollupTests(TestCase):
+    def test_rescheduled_session_moves_its_rollups(self):
+        session = make_session()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_booking(session, is_confirmed=True)
+        event = Event.objects.create(name='Escape night')
+
+        session.date += datetime.timedelta(days=7)
+        session.event = event
+        with self.captureOnCommitCallbacks(execute=True):
+            session.save()
+        self.assertEqual(
+            list(BookingRollup.objects.values_list('session_date', 'event_id', 'seats')),
+            [(session.date, event.pk, 2)],
+        )
+
+
+class ConcurrentRollupTests(TransactionTestCase):
+    def test_refresh_reading_earlier_does_not_write_last(self):
+        session = make_session()
+        make_booking(session, is_confirmed=True)
+        read = threading.Event()
+        rollups = rollups_module._rollups
+
+        def slow_rollups(bookings):
+            rows = list(rollups(bookings))
+            if threading.current_thread().name == 'first':
+                # Give a booking made meanwhile the chance to refresh first
+                read.set()
+                time.sleep(0.5)
+            return rows
+
+        def refresh():
+            try:
+                rollups_module.refresh_rollups([session.pk])
+            finally:
+                connection.close()
+
+        with mock.patch.object(rollups_module, '_rollups', slow_rollups):
+            first = threading.Thread(target=refresh, name='first')
+            first.start()
+            read.wait(5)
+            make_booking(session, email='second@example.com', is_confirmed=True)
+            first.join()
+        self.assertEqual(BookingRollup.objects.get().bookings, 2)
+
+
+class CancelledBookingPaymentTests(TestCase):
+    def setUp(self):
+        self.booking = make_booking(make_session())
+        transition(self.booking, 'expire')
+
+    def test_payment_page_redirects(self):
+        response = self.client.get(f'/en/payment/{self.booking.access_token}/')
+        self.assertRedirects(response, '/en/sessions/', fetch_redirect_response=False)
+
+    @mock.patch('events.models.get_provider')
+    def test_no_intent_is_created(self, get_provider):
+        response = self.client.post(f'/en/payment/{self.booking.access_token}/intent/')
+        self.assertEqual(response.status_code, 409)
+        self.assertIsNone(self.booking.card_client_secret())
+        get_provider.assert_not_called()
+
+    @mock.patch('events.views.get_provider')
+    def test_late_payment_is_refunded(self, get_provider):
+        stripe = get_provider.return_value
+        stripe.parse_webhook.return_value = {'type': 'payment_intent.succeeded', 'data': {'object': {
+            'id': 'pi_late', 'status': 'succeeded', 'metadata': {'booking_id': str(self.booking.pk)},
+        }}}
+        stripe.refund.return_value = {'id': 're_late'}
+
+        response = self.client.post('/stripe/webhook/', '{}', content_type='application/json')
+        self.assertEqual(response.json(), {'status': 'already processed'})
+        stripe.refund.assert_called_once_with('pi_late', idempotency_key=f'refund-booking-{self.booking.pk}')
+        self.booking.refresh_from_db()
+        self.assertEqual((self.booking.status, self.booking.payment_status, self.booking.refund_id),
+                         ('cancelled', 'refunded', 're_late'))
+
+    @mock.patch('events.views.get_provider')
+    def test_late_paypal_capture_is_refunded(self, get_provider):
+        paypal = get_provider.return_value
+        paypal.refund.return_value = {'id': 'refund-late'}
+
+        response = self.client.post('/paypal/webhook/', json.dumps({'event_type': 'PAYMENT.CAPTURE.COMPLETED', 'resource': {
+            'id': 'capture-late', 'custom_id': self.booking.booking_reference,
+        }}), content_type='application/json')
+        self.assertEqual(response.json(), {'status': 'already processed'})
+        get_provider.assert_called_with('paypal')
+        paypal.refund.assert_called_once_with('capture-late', idempotency_key=f'refund-booking-{self.booking.pk}')
+        self.booking.refresh_from_db()
+        self.assertEqual((self.booking.status, self.booking.payment_status, self.booking.refund_id),
+                         ('cancelled', 'refunded', 'refund-late'))
+
+
+class SharedValidatorTests(TestCase):
+    """Two gunicorn workers, each with its own handle on the shared cache."""
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        self.workers = [FileBasedCache(location, {}) for _worker in range(2)]
+        self.session = make_session()
+
+    def get(self, worker, **headers):
+        with mock.patch('core.cache.cache', worker):
+            return self.client.get('/en/sessions/', **headers)
+
+    def test_booking_in_one_worker_changes_the_etag_in_the_other(self):
+        first, second = self.workers
+        etag = self.get(second).headers['ETag']
+        self.assertEqual(self.get(first).headers['ETag'], etag)
+
+        with mock.patch('core.cache.cache', first):
+            make_booking(self.session)
+
+        self.assertNotEqual(self.get(second).headers['ETag'], etag)
+        self.assertEqual(self.get(second, HTTP_IF_NONE_MATCH=etag).status_code, 200)
@@ -6,7 +6,14 @@ urlpatterns = [
     path('book/<int:session_id>/', views.book_session, name='book_session'),
     path('booking-success/<uuid:access_token>/', views.booking_success, name='booking_success'),
     path('payment/<uuid:access_token>/', views.payment, name='payment'),
+    path('payment/<uuid:access_token>/intent/', views.payment_intent, name='payment_intent'),
     path('api/availability/<int:session_id>/', views.check_availability, name='check_availability'),
+    path('api/sessions/', views.sessions_api, name='sessions_api'),
+    # Door check-in (staff only)
+    path('checkin/', views.checkin_door, name='checkin_door'),
+    path('checkin/manifest/<int:session_id>/', views.checkin_manifest, name='checkin_manifest'),
+    path('checkin/scan/', views.checkin_scan, name='checkin_scan'),
+    path('checkin/sync/', views.checkin_sync, name='checkin_sync'),
     # Webhooks
     #path('webhooks/stripe/', views.stripe_webhook, name='stripe_webhook'),
     #path('webhooks/paypal/', views.paypal_webhook, name='paypal_webhook'),
@@ -1,90 +1,154 @@
+import json
+import logging
+import uuid
+from datetime import timedelta
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.utils import timezone
-from django.core.paginator import Paginator
+from django.utils.translation import get_language
 from django.http import JsonResponse
+from django.urls import reverse
 from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.views.decorators.cache import never_cache
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
-import stripe
-from .models import GameSession, Booking, TicketType
+from .cancellations import refund_idempotency_key
+from .checkin import attach_checkin_qr, check_in, check_in_many, session_manifest
+from .inventory import SoldOut, take_tickets, tickets_left
+from .models import GameSession, Booking
+from .payments import PaymentError, ProviderUnavailable, get_provider
 from .forms import BookingForm
+from .pagination import keyset_page
+from .services import BookingContext, attach_ticket_availability, group_sessions, with_availability
+from .states import TRANSITIONS, TransitionNotAllowed, transition
 from sections.models import Header
+from core.http import conditional_content
+from core.ratelimit import rate_limit
+from core.translations import prefetch_translations
 
+logger = logging.getLogger(__name__)
 
-def sessions_list(request):
-    """
-    List sessions grouped by event.
-
-    Layout:
-      - Active events whose earliest upcoming session falls within the date
-        filter are shown as large event cards, with each of their upcoming
-        sessions listed as bookable timeslot rows inside.
-      - Sessions with no event attached are shown as standalone cards below.
-    """
-    from .models import Event
-    from django.db.models import Prefetch
 
+def _upcoming_sessions(request):
+    """Upcoming, active sessions narrowed by the date_from/date_to filters."""
     date_from = request.GET.get('date_from')
     date_to   = request.GET.get('date_to')
     today     = timezone.now().date()
 
-    # Base queryset — upcoming, active sessions only
-    base_qs = (
+    qs = prefetch_translations(
         GameSession.objects
         .filter(date__gte=today, is_active=True)
         .select_related('event')
-        .prefetch_related('bookings')
-        .order_by('date', 'start_time')
     )
     if date_from:
-        base_qs = base_qs.filter(date__gte=date_from)
+        qs = qs.filter(date__gte=date_from)
     if date_to:
-        base_qs = base_qs.filter(date__lte=date_to)
-
-    # Fetch events that have at least one upcoming session in the filter window
-    events_qs = (
-        Event.objects
-        .filter(is_active=True, sessions__in=base_qs)
-        .prefetch_related(
-            Prefetch(
-                'sessions',
-                queryset=base_qs.filter(event__isnull=False),
-                to_attr='upcoming_sessions',
-            ),
-            Prefetch('ticket_types', to_attr='active_ticket_types'),
-        )
-        .distinct()
-    )
+        qs = qs.filter(date__lte=date_to)
+    return qs
 
-    # Deduplicate while preserving earliest-session order
-    seen = set()
-    event_cards = []
-    for event in events_qs:
-        if event.id not in seen:
-            seen.add(event.id)
-            event_cards.append(event)
-    event_cards.sort(
-        key=lambda e: e.upcoming_sessions[0].date if e.upcoming_sessions else today
-    )
 
-    # Standalone sessions that belong to no event
-    standalone_sessions = base_qs.filter(event__isnull=True)
+def _next_page_url(request, next_cursor):
+    if not next_cursor:
+        return None
+    params = request.GET.copy()
+    params.pop('partial', None)
+    params['cursor'] = next_cursor
+    return f"{request.path}?{params.urlencode()}"
+
+
+@conditional_content('sessions')
+def sessions_list(request):
+    """
+    List sessions grouped by event, one keyset page at a time.
 
-    header = Header.objects.filter(page='sessions').first()
+    Layout:
+      - Active events with sessions on this page are shown as large event
+        cards, with each of their sessions listed as bookable timeslot rows.
+      - Sessions with no event attached are shown as standalone cards below.
+
+    A page holds at most SESSIONS_PAGE_SIZE sessions spanning at most
+    SESSIONS_WINDOW_DAYS; "Load more" requests the next page with
+    ?cursor=...&partial=1 and appends the returned cards.
+    """
+    date_from = request.GET.get('date_from')
+    date_to   = request.GET.get('date_to')
+    cursor    = request.GET.get('cursor')
+
+    base_qs = with_availability(_upcoming_sessions(request))
+    try:
+        page_sessions, next_cursor = keyset_page(base_qs, cursor)
+    except ValueError:
+        cursor = None
+        page_sessions, next_cursor = keyset_page(base_qs)
+
+    event_cards, standalone_sessions = group_sessions(page_sessions)
 
     context = {
         'event_cards':         event_cards,
         'standalone_sessions': standalone_sessions,
         'date_from':           date_from,
         'date_to':             date_to,
-        'header':              header,
+        'cursor':              cursor,
+        'next_page_url':       _next_page_url(request, next_cursor),
     }
+    if request.GET.get('partial'):
+        return render(request, 'games/partials/_session_cards.html', context)
+
+    context['header'] = Header.objects.filter(page='sessions').first()
     return render(request, 'games/sessions.html', context)
 
 
+@conditional_content('sessions')
+def sessions_api(request):
+    """JSON variant of sessions_list: a flat keyset page of sessions."""
+    base_qs = with_availability(_upcoming_sessions(request))
+
+    try:
+        page_sessions, next_cursor = keyset_page(base_qs, request.GET.get('cursor'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    attach_ticket_availability(page_sessions)
+
+    sessions = []
+    for session in page_sessions:
+        available = session.available_spots
+        sessions.append({
+            'id': session.id,
+            'name': session.safe_translation_getter('name', any_language=True),
+            'date': session.date.isoformat(),
+            'start_time': session.start_time.strftime('%H:%M'),
+            'end_time': session.end_time.strftime('%H:%M'),
+            'event': {'id': session.event.id, 'name': session.event.name} if session.event else None,
+            'collab': session.collab,
+            'price_per_person': str(session.price_per_person),
+            'private': session.private,
+            'available_spots': available,
+            'is_full': available == 0,
+            'max_participants': session.max_participants,
+            'ticket_types': [
+                {
+                    'id': availability['ticket_type'].id,
+                    'name': availability['ticket_type'].name,
+                    'price': str(availability['ticket_type'].price),
+                    'participant_count': availability['ticket_type'].participant_count,
+                    'tickets_left': availability['tickets_left'],
+                }
+                for availability in session.ticket_availability
+            ],
+            'book_url': reverse('book_session', args=[session.id]),
+        })
+
+    return JsonResponse({
+        'sessions': sessions,
+        'next_cursor': next_cursor,
+        'next_url': _next_page_url(request, next_cursor),
+    })
+
+
 def booking_success(request, access_token):
     booking = get_object_or_404(
         Booking.objects.select_related('session', 'ticket_type'),
@@ -96,43 +160,55 @@ def booking_success(request, access_token):
 def check_availability(request, session_id):
     """AJAX endpoint to check session availability"""
     session = get_object_or_404(GameSession, id=session_id)
+    attach_ticket_availability([session])
     return JsonResponse({
         'available_spots': session.available_spots,
         'is_full': session.is_full,
         'max_participants': session.max_participants,
+        'tickets_left': {
+            availability['ticket_type'].id: availability['tickets_left']
+            for availability in session.ticket_availability
+        },
     })
 
 
+@rate_limit('booking', ip='10/10m', email='5/h', email_field='customer_email')
 def book_session(request, session_id):
     """Booking view — supports both legacy (price_per_person) and ticket-type pricing."""
-    session = get_object_or_404(
-        GameSession.objects.select_related('event'),
-        id=session_id,
-        is_active=True,
-    )
+    if request.method == 'POST':
+        # Before the availability checks: the seats may be gone because of
+        # the very booking this post already made
+        submitted = _submitted_booking(request, session_id)
+        if submitted:
+            return _redirect_after_booking(submitted)
+
+    booking_context = BookingContext.for_session(session_id)
+    session = booking_context.session
 
     if not session.is_upcoming:
         messages.error(request, 'This session has already passed.')
         return redirect('sessions_list')
 
-    if session.is_full:
+    if booking_context.is_full:
         messages.error(request, 'This session is fully booked.')
         return redirect('sessions_list')
 
-    # Ticket types for this session's event (empty queryset if no event attached)
-    ticket_types = session.ticket_types
+    # Active ticket types for this session's event (empty if no event attached)
+    ticket_types = booking_context.ticket_types
 
     if request.method == 'POST':
-        form = BookingForm(request.POST, session=session)
+        form = BookingForm(request.POST, booking_context=booking_context)
 
         # ── Ticket-type pricing path ──────────────────────────────────────
-        if session.has_ticket_types:
+        if booking_context.has_ticket_types:
             ticket_type_id = request.POST.get('ticket_type_id')
-            ticket_quantity = int(request.POST.get('ticket_quantity', 1))
-
             try:
-                ticket_type = ticket_types.get(id=ticket_type_id)
-            except TicketType.DoesNotExist:
+                ticket_quantity = int(request.POST.get('ticket_quantity', 1))
+            except (TypeError, ValueError):
+                ticket_quantity = 0
+
+            ticket_type = booking_context.get_ticket_type(ticket_type_id)
+            if ticket_type is None:
                 messages.error(request, 'Please select a valid ticket type.')
                 return render(request, 'games/booking.html', {
                     'form': form,
@@ -140,8 +216,16 @@ def book_session(request, session_id):
                     'ticket_types': ticket_types,
                 })
 
+            if ticket_quantity < 1:
+                messages.error(request, 'Please choose at least one ticket.')
+                return render(request, 'games/booking.html', {
+                    'form': form,
+                    'session': session,
+                    'ticket_types': ticket_types,
+                })
+
             spots_needed = ticket_type.participant_count * ticket_quantity
-            if spots_needed > session.available_spots:
+            if spots_needed > booking_context.available_spots:
                 messages.error(request, 'Not enough spots available for the selected tickets.')
                 return render(request, 'games/booking.html', {
                     'form': form,
@@ -149,15 +233,26 @@ def book_session(request, session_id):
                     'ticket_types': ticket_types,
                 })
 
+            if ticket_type.tickets_left is not None and ticket_quantity > ticket_type.tickets_left:
+                return _sold_out(request, form, session, ticket_types, ticket_type)
+
             if form.is_valid():
                 booking = form.save(commit=False)
                 booking.session = session
                 booking.ticket_type = ticket_type
                 booking.ticket_quantity = ticket_quantity
+                booking.language = get_language()
+                booking.submission_token = form.cleaned_data['submission_token']
                 # participants & total_price are computed in Booking.save()
-                booking.save()
-
-                _finalize_booking(request, booking, session)
+                try:
+                    booking, created = _save_new_booking(booking)
+                except SoldOut:
+                    # Taken by someone else since the page was loaded
+                    ticket_type.tickets_left = tickets_left([(session.pk, ticket_type)])[session.pk, ticket_type.pk]
+                    return _sold_out(request, form, session, ticket_types, ticket_type)
+
+                if created:
+                    _finalize_booking(request, booking, booking_context)
                 return _redirect_after_booking(booking)
 
         # ── Legacy / fallback pricing path ───────────────────────────────
@@ -165,8 +260,10 @@ def book_session(request, session_id):
             if form.is_valid():
                 booking = form.save(commit=False)
                 booking.session = session
+                booking.language = get_language()
+                booking.submission_token = form.cleaned_data['submission_token']
 
-                if booking.participants > session.available_spots:
+                if booking.participants > booking_context.available_spots:
                     messages.error(request, 'Not enough spots available.')
                     return render(request, 'games/booking.html', {
                         'form': form,
@@ -174,12 +271,13 @@ def book_session(request, session_id):
                         'ticket_types': ticket_types,
                     })
 
-                booking.save()
-                _finalize_booking(request, booking, session)
+                booking, created = _save_new_booking(booking)
+                if created:
+                    _finalize_booking(request, booking, booking_context)
                 return _redirect_after_booking(booking)
 
     else:
-        form = BookingForm(session=session)
+        form = BookingForm(booking_context=booking_context)
 
     context = {
         'form': form,
@@ -192,24 +290,84 @@ def book_session(request, session_id):
 
 # ── Private helpers ───────────────────────────────────────────────────────────
 
-def _finalize_booking(request, booking, session):
+def _submitted_booking(request, session_id):
+    """The booking an earlier post of this same form created, if any."""
+    try:
+        token = uuid.UUID(request.POST.get('submission_token', ''))
+    except ValueError:
+        return None
+    return (
+        Booking.objects
+        # The email must match too, so a token can't be used to look up
+        # somebody else's booking
+        .filter(
+            submission_token=token,
+            session_id=session_id,
+            customer_email__iexact=request.POST.get('customer_email', '').strip(),
+        )
+        .only('access_token', 'payment_status')
+        .first()
+    )
+
+
+def _sold_out(request, form, session, ticket_types, ticket_type):
+    if ticket_type.tickets_left:
+        messages.error(request, f'Only {ticket_type.tickets_left} {ticket_type.name} tickets are left for this session.')
+    else:
+        messages.error(request, f'{ticket_type.name} tickets are sold out for this session.')
+    return render(request, 'games/booking.html', {
+        'form': form,
+        'session': session,
+        'ticket_types': ticket_types,
+    })
+
+
+def _take_tickets_and_save(booking):
+    """Save a new booking, taking its tickets if the type is limited; raises SoldOut."""
+    with transaction.atomic():
+        if booking.ticket_type and not take_tickets(booking.session_id, booking.ticket_type, booking.ticket_quantity):
+            raise SoldOut(booking.ticket_type.name)
+        booking.save()
+    return booking
+
+
+def _save_new_booking(booking):
+    """
+    Save a new booking; returns (booking, created). If a concurrent post of
+    the same form saved first, that booking is returned instead. Raises
+    SoldOut if a limited ticket type ran out.
+    """
+    try:
+        return _take_tickets_and_save(booking), True
+    except IntegrityError:
+        existing = booking.submission_token and Booking.objects.filter(
+            submission_token=booking.submission_token,
+        ).first()
+        if not existing:
+            raise
+    if existing.session_id == booking.session_id and existing.customer_email.lower() == booking.customer_email.lower():
+        return existing, False
+    # Somebody else's token (a form served to two visitors): book without it
+    booking.submission_token = None
+    return _take_tickets_and_save(booking), True
+
+
+def _finalize_booking(request, booking, booking_context):
     """Confirm free bookings immediately; paid ones proceed to the payment page."""
     is_free = (
         booking.total_price == 0
-        or (not session.has_ticket_types and session.price_per_person == 0)
+        or (not booking_context.has_ticket_types
+            and booking_context.session.price_per_person == 0)
     )
     if is_free:
-        booking.payment_status = 'completed'
-        booking.is_confirmed = True
-        booking.status = 'confirmed'
-        booking.save()
+        transition(booking, 'confirm_free')
         send_booking_confirmation_email(booking)
 
 
 def _redirect_after_booking(booking):
     if booking.payment_status == 'completed':
         return redirect('booking_success', access_token=booking.access_token)
-    booking.create_payment_intent()
+    # The Stripe intent is created only if the customer goes on to pay by card
     return redirect('payment', access_token=booking.access_token)
 
 
@@ -221,13 +379,24 @@ def payment(request, access_token):
         access_token=access_token,
     )
 
+    # Expired or cancelled; its seats may have been booked again
+    if booking.status == 'cancelled':
+        messages.error(request, 'This booking has been cancelled.')
+        return redirect('sessions_list')
+
     # Cash payment
     if request.method == 'POST' and request.POST.get('payment_method') == 'cash':
-        booking.payment_method = 'cash'
-        booking.payment_status = 'pending'
-        booking.is_confirmed = True
-        booking.status = 'confirmed'
-        booking.save()
+        if booking.payment_method == 'cash' and booking.is_confirmed:
+            # Submitted twice
+            return redirect('booking_success', access_token=booking.access_token)
+        try:
+            transition(booking, 'confirm_cash')
+        except TransitionNotAllowed:
+            if Booking.objects.filter(pk=booking.pk, status='cancelled').exists():
+                messages.error(request, 'This booking has been cancelled.')
+                return redirect('sessions_list')
+            # Paid in the meantime
+            return redirect('booking_success', access_token=booking.access_token)
         send_cash_payment_confirmation_email(booking)
         messages.success(request, 'Booking confirmed! Please bring cash to the event.')
         return redirect('booking_success', access_token=booking.access_token)
@@ -236,22 +405,45 @@ def payment(request, access_token):
     if booking.payment_status == 'completed':
         return redirect('booking_success', access_token=booking.access_token)
 
-    # Create / retrieve Stripe payment intent
-    if not booking.stripe_payment_intent_id:
-        payment_intent = booking.create_payment_intent()
-    else:
-        stripe.api_key = settings.STRIPE_SECRET_KEY
-        payment_intent = stripe.PaymentIntent.retrieve(booking.stripe_payment_intent_id)
+    # The stored client secret is enough to render the card form; a missing
+    # or stale one is fetched by the page from payment_intent when needed
+    client_secret = None
+    if booking.stripe_client_secret and not booking.payment_intent_is_stale:
+        client_secret = booking.stripe_client_secret
 
     context = {
         'booking': booking,
-        'client_secret': payment_intent.client_secret if payment_intent else None,
+        'client_secret': client_secret,
         'stripe_public_key': settings.STRIPE_PUBLISHABLE_KEY,
         'paypal_client_id': getattr(settings, 'PAYPAL_CLIENT_ID', ''),
     }
     return render(request, 'games/payment.html', context)
 
 
+@require_POST
+def payment_intent(request, access_token):
+    """Client secret for card payment; creates the Stripe intent on first use."""
+    booking = get_object_or_404(
+        Booking.objects.select_related('session', 'ticket_type'),
+        access_token=access_token,
+    )
+    if booking.payment_status == 'completed':
+        return JsonResponse({
+            'error': 'This booking is already paid.',
+            'redirect': reverse('booking_success', args=[booking.access_token]),
+        }, status=409)
+    if booking.status == 'cancelled':
+        return JsonResponse({
+            'error': 'This booking has been cancelled.',
+            'redirect': reverse('sessions_list'),
+        }, status=409)
+
+    client_secret = booking.card_client_secret()
+    if not client_secret:
+        return JsonResponse({'error': 'Card payment is unavailable right now. Please try again or pay at the event.'}, status=503)
+    return JsonResponse({'client_secret': client_secret})
+
+
 # ── Webhooks ──────────────────────────────────────────────────────────────────
 
 @csrf_exempt
@@ -260,14 +452,18 @@ def stripe_webhook(request):
     """Handle Stripe webhook events"""
     payload = request.body
     sig_header = request.META.get('HTTP_STRIPE_SIGNATURE')
-    endpoint_secret = settings.STRIPE_WEBHOOK_SECRET
 
     try:
-        event = stripe.Webhook.construct_event(payload, sig_header, endpoint_secret)
-    except ValueError:
-        return JsonResponse({'error': 'Invalid payload'}, status=400)
-    except stripe.error.SignatureVerificationError:
-        return JsonResponse({'error': 'Invalid signature'}, status=400)
+        event = get_provider('stripe').parse_webhook(payload, sig_header)
+    except PaymentError:
+        return JsonResponse({'error': 'Invalid payload or signature'}, status=400)
+
+    if event['type'].startswith('payment_intent.'):
+        # Keep the booking's copy of the intent current for the payment page
+        intent = event['data']['object']
+        booking = Booking.objects.filter(id=intent.get('metadata', {}).get('booking_id')).first()
+        if booking and booking.stripe_payment_intent_id in ('', intent['id']):
+            booking.sync_payment_intent(intent)
 
     if event['type'] == 'payment_intent.succeeded':
         payment_intent = event['data']['object']
@@ -275,35 +471,57 @@ def stripe_webhook(request):
 
         try:
             booking = Booking.objects.get(id=booking_id)
-
-            if booking.payment_status == 'completed':
-                return JsonResponse({'status': 'already processed'})
-
-            booking.payment_status = 'completed'
-            booking.is_confirmed = True
-            booking.status = 'confirmed'
-            booking.payment_completed_at = timezone.now()
-            booking.payment_method = payment_intent.get('payment_method_types', ['card'])[0]
-            booking.save()
-
-            send_booking_confirmation_email(booking)
-
+            transition(
+                booking, 'mark_paid',
+                payment_completed_at=timezone.now(),
+                payment_method=payment_intent.get('payment_method_types', ['card'])[0],
+            )
         except Booking.DoesNotExist:
             pass
+        except TransitionNotAllowed:
+            if TRANSITIONS['refund_cancelled'].allows(booking):
+                _refund_cancelled_booking(booking, 'stripe', payment_intent['id'])
+            return JsonResponse({'status': 'already processed'})
+        else:
+            send_booking_confirmation_email(booking)
 
     return JsonResponse({'status': 'success'})
 
 
+def _refund_cancelled_booking(booking, provider, payment_id):
+    """A booking was paid after it expired or was cancelled: give the money back."""
+    try:
+        refund = get_provider(provider).refund(payment_id, idempotency_key=refund_idempotency_key(booking.pk))
+    except PaymentError as e:
+        logger.error("Booking %s was paid after it was cancelled and the refund failed, refund it by hand: %s",
+                     booking.booking_reference, e)
+        return
+    try:
+        transition(booking, 'refund_cancelled', refund_id=refund['id'])
+    except TransitionNotAllowed:
+        # Refunded by a repeat of this webhook
+        pass
+    logger.warning("Refunded booking %s, paid after it was cancelled", booking.booking_reference)
+
+
 @csrf_exempt
 @require_POST
 def paypal_webhook(request):
     """Handle PayPal webhook events"""
-    import json
-
     try:
         data = json.loads(request.body)
         event_type = data.get('event_type')
 
+        if settings.PAYPAL_WEBHOOK_ID:
+            paypal = get_provider('paypal')
+            try:
+                genuine = paypal.verify_webhook(request.headers, data)
+            except ProviderUnavailable:
+                # PayPal retries deliveries that don't get a 2xx
+                return JsonResponse({'error': 'Verification unavailable'}, status=503)
+            if not genuine:
+                return JsonResponse({'error': 'Invalid signature'}, status=400)
+
         if event_type == 'PAYMENT.CAPTURE.COMPLETED':
             resource = data.get('resource', {})
             booking_reference = resource.get('custom_id')
@@ -311,23 +529,99 @@ def paypal_webhook(request):
             if booking_reference:
                 try:
                     booking = Booking.objects.get(booking_reference=booking_reference)
-                    booking.payment_status = 'completed'
-                    booking.is_confirmed = True
-                    booking.status = 'confirmed'
-                    booking.payment_method = 'paypal'
-                    booking.payment_completed_at = timezone.now()
-                    booking.save()
-
-                    send_booking_confirmation_email(booking)
-
+                    transition(booking, 'mark_paid', payment_method='paypal', payment_completed_at=timezone.now())
                 except Booking.DoesNotExist:
                     pass
+                except TransitionNotAllowed:
+                    if TRANSITIONS['refund_cancelled'].allows(booking):
+                        _refund_cancelled_booking(booking, 'paypal', resource.get('id'))
+                    return JsonResponse({'status': 'already processed'})
+                else:
+                    send_booking_confirmation_email(booking)
 
         return JsonResponse({'status': 'success'})
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
 
 
+# ── Door check-in ─────────────────────────────────────────────────────────────
+
+def _json_payload(request):
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def _session_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@staff_member_required
+@never_cache
+def checkin_door(request):
+    """Scanner page for the door device; works offline once a manifest is loaded."""
+    today = timezone.localdate()
+    sessions = prefetch_translations(
+        GameSession.objects.filter(
+            date__range=(today - timedelta(days=1), today + timedelta(days=1)),
+            is_active=True,
+        )
+    )
+    return render(request, 'games/checkin.html', {'sessions': sessions, 'today': today})
+
+
+@staff_member_required
+@never_cache
+def checkin_manifest(request, session_id):
+    session = get_object_or_404(GameSession, id=session_id)
+    return JsonResponse(session_manifest(session))
+
+
+@staff_member_required
+@require_POST
+def checkin_scan(request):
+    """Check in one scanned token: {"token": ..., "session": id}."""
+    payload = _json_payload(request)
+    if payload is None:
+        return JsonResponse({'error': 'Invalid payload'}, status=400)
+
+    outcome, booking = check_in(
+        payload.get('token'),
+        session_id=_session_id(payload.get('session')),
+        user=request.user,
+    )
+    data = {'outcome': outcome}
+    if booking is not None:
+        data.update({
+            'reference': booking.booking_reference,
+            'name': booking.customer_name,
+            'participants': booking.participants,
+            'ticket_type': booking.ticket_type.name if booking.ticket_type else '',
+            'checked_in_at': booking.checked_in_at.isoformat() if booking.checked_in_at else None,
+        })
+    return JsonResponse(data)
+
+
+@staff_member_required
+@require_POST
+def checkin_sync(request):
+    """Apply scans queued offline: {"session": id, "scans": [[token, scanned_at], ...]}."""
+    payload = _json_payload(request)
+    scans = payload.get('scans') if payload else None
+    if not isinstance(scans, list) or not all(
+        isinstance(s, list) and len(s) == 2 and isinstance(s[0], str) for s in scans
+    ):
+        return JsonResponse({'error': 'Invalid payload'}, status=400)
+
+    outcomes = check_in_many(scans, session_id=_session_id(payload.get('session')), user=request.user)
+    return JsonResponse({'outcomes': outcomes})
+
+
 # ── Email helpers ─────────────────────────────────────────────────────────────
 
 def send_booking_confirmation_email(booking):
@@ -349,6 +643,7 @@ def send_booking_confirmation_email(booking):
         to=[booking.customer_email],
     )
     email.attach_alternative(html_content, "text/html")
+    attach_checkin_qr(email, booking)
 
     try:
         email.send()
@@ -375,6 +670,7 @@ def send_cash_payment_confirmation_email(booking):
         to=[booking.customer_email],
     )
     email.attach_alternative(html_content, "text/html")
+    attach_checkin_qr(email, booking)
 
     try:
         email.send()
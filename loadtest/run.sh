@@ -0,0 +1,40 @@
+#!/bin/bash
+set -e
+
+# Compares throughput of the plain nginx profile (every request hits
+# gunicorn) with the micro-caching profile, for anonymous page views.
+#
+#   bash loadtest/run.sh [requests] [concurrency]
+
+REQUESTS=${1:-5000}
+CONCURRENCY=${2:-50}
+PAGES="/en/ /hr/sessions/ /en/about/"
+COMPOSE="docker compose -f $(dirname "$0")/docker-compose.yml"
+
+echo "Starting containers..."
+$COMPOSE up -d
+echo "Waiting for gunicorn..."
+until curl -s -o /dev/null -H "Host: vumgames.com" http://127.0.0.1:8080/en/; do
+    sleep 2
+done
+
+bench() {
+    docker run --rm --network host httpd:alpine \
+        ab -q -n "$REQUESTS" -c "$CONCURRENCY" -H "Host: vumgames.com" "$1" \
+        | grep -E "Requests per second|Time per request.*mean\)|Failed requests"
+}
+
+for page in $PAGES; do
+    echo ""
+    echo "================================"
+    echo "$page"
+    echo "================================"
+    echo "-- plain (port 8080)"
+    bench "http://127.0.0.1:8080$page"
+    echo "-- micro-cache (port 8090)"
+    bench "http://127.0.0.1:8090$page"
+done
+
+echo ""
+echo "Stopping containers..."
+$COMPOSE down
@@ -0,0 +1,57 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.urls import reverse, translate_url
+from django.utils import translation
+
+from playground.urls import app_name, urlpatterns
+
+'''
+python3 manage.py prerender_playground
+
+Writes STATIC_ROOT/prerendered/<lang>/playground/<game>/index.html for every
+language, which nginx serves directly (see nginx.conf). Re-run after
+collectstatic whenever playground templates or base.html change.
+'''
+
+class Command(BaseCommand):
+    help = "Pre-render the playground pages for every language into static HTML"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            type=str,
+            default=str(Path(settings.STATIC_ROOT) / "prerendered"),
+            help="Directory to write the rendered pages to",
+        )
+
+    def handle(self, *args, **options):
+        output_dir = Path(options["output"])
+        factory = RequestFactory()
+        written = 0
+
+        for lang_code, _name in settings.LANGUAGES:
+            with translation.override(lang_code):
+                for pattern in urlpatterns:
+                    path = reverse(f"{app_name}:{pattern.name}")
+
+                    request = factory.get(path)
+                    request.LANGUAGE_CODE = lang_code
+                    # base.html swaps the CSRF-protected language form for
+                    # plain links when rendering for a static file.
+                    request.prerendered = True
+                    request.alternate_urls = {
+                        code: translate_url(path, code) for code, _ in settings.LANGUAGES
+                    }
+
+                    response = pattern.callback(request)
+
+                    target = output_dir / path.lstrip("/") / "index.html"
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    target.write_bytes(response.content)
+                    written += 1
+                    self.stdout.write(f"  {path} → {target}")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Pre-rendered {written} playground pages"))
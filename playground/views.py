@@ -1,5 +1,7 @@
 from django.shortcuts import render
+from core.http import conditional_content
 
+@conditional_content()
 def playground(request):
     """Main playground view with game selection"""
     games = [
@@ -14,26 +16,34 @@ def playground(request):
     ]
     return render(request, 'playground/playground.html', {'games': games})
 
+@conditional_content()
 def breakout(request):
     return render(request, 'playground/breakout.html')
 
+@conditional_content()
 def bubble_shooter(request):
     return render(request, 'playground/bubble_shooter.html')
 
+@conditional_content()
 def memory_cards(request):
     return render(request, 'playground/memory_cards.html')
 
+@conditional_content()
 def pacman(request):
     return render(request, 'playground/pacman.html')
 
+@conditional_content()
 def piano_shooter(request):
     return render(request, 'playground/piano_shooter.html')
 
+@conditional_content()
 def pong(request):
     return render(request, 'playground/pong.html')
 
+@conditional_content()
 def tetris(request):
     return render(request, 'playground/tetris.html')
 
+@conditional_content()
 def tictactoe(request):
     return render(request, 'playground/tictactoe.html')
\ No newline at end of file
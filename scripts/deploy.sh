@@ -38,6 +38,7 @@ sudo mkdir -p $PROJECT_DIR/logs
 sudo mkdir -p $PROJECT_DIR/staticfiles
 sudo mkdir -p $PROJECT_DIR/media
 sudo mkdir -p $PROJECT_DIR/db
+sudo mkdir -p $PROJECT_DIR/cache/default $PROJECT_DIR/cache/ratelimit
 sudo mkdir -p $PROJECT_DIR/locale
 
 # Set ownership and permissions
@@ -81,6 +82,9 @@ fi
 echo "Running Django migrations..."
 sudo -u www-data $PROJECT_DIR/venv/bin/python manage.py migrate
 
+echo "Rebuilding booking reports..."
+sudo -u www-data $PROJECT_DIR/venv/bin/python manage.py rebuild_rollups
+
 # Create translations (if using django-parler)
 echo "Compiling translations..."
 if [ -d "$PROJECT_DIR/locale" ]; then
@@ -91,6 +95,9 @@ fi
 echo "Collecting static files..."
 sudo -u www-data $PROJECT_DIR/venv/bin/python manage.py collectstatic --noinput
 
+echo "Pre-rendering playground pages..."
+sudo -u www-data $PROJECT_DIR/venv/bin/python manage.py prerender_playground
+
 # Create superuser (optional)
 echo ""
 echo "Do you want to create a Django superuser? (y/n)"
@@ -108,7 +115,13 @@ sudo systemctl restart ${SERVICE_NAME}
 
 # Setup Nginx
 echo "Setting up Nginx..."
-sudo cp $PROJECT_DIR/nginx.conf /etc/nginx/sites-available/vumgames
+# NGINX_CONF=nginx-microcache.conf enables page micro-caching
+NGINX_CONF=${NGINX_CONF:-nginx.conf}
+if [ "$NGINX_CONF" = "nginx-microcache.conf" ]; then
+    sudo mkdir -p /var/cache/nginx/vumgames
+    sudo chown www-data:www-data /var/cache/nginx/vumgames
+fi
+sudo cp $PROJECT_DIR/$NGINX_CONF /etc/nginx/sites-available/vumgames
 sudo ln -sf /etc/nginx/sites-available/vumgames /etc/nginx/sites-enabled/
 
 # Test Nginx configuration
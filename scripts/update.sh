@@ -19,9 +19,20 @@ sudo -u www-data git pull origin main
 echo "Installing/updating Python dependencies..."
 sudo -u www-data $PROJECT_DIR/venv/bin/pip install -r requirements.txt --upgrade
 
+# Shared by all gunicorn workers (CACHES in settings.py); clear it so no
+# page rendered by the old code is served after the restart
+echo "Clearing the page cache..."
+sudo -u www-data mkdir -p $PROJECT_DIR/cache/default
+sudo -u www-data find $PROJECT_DIR/cache/default -name '*.djcache' -delete
+# Rate-limit counters (kept across deploys)
+sudo -u www-data mkdir -p $PROJECT_DIR/cache/ratelimit
+
 echo "Running migrations..."
 sudo -u www-data $PROJECT_DIR/venv/bin/python manage.py migrate
 
+echo "Rebuilding booking reports..."
+sudo -u www-data $PROJECT_DIR/venv/bin/python manage.py rebuild_rollups
+
 echo "Compiling translations..."
 if [ -d "$PROJECT_DIR/locale" ]; then
     sudo -u www-data $PROJECT_DIR/venv/bin/python manage.py compilemessages || echo "No translations to compile"
@@ -30,6 +41,9 @@ fi
 echo "Collecting static files..."
 sudo -u www-data $PROJECT_DIR/venv/bin/python manage.py collectstatic --noinput
 
+echo "Pre-rendering playground pages..."
+sudo -u www-data $PROJECT_DIR/venv/bin/python manage.py prerender_playground
+
 echo "Restarting Gunicorn..."
 sudo systemctl restart ${SERVICE_NAME}
 
@@ -37,7 +37,11 @@ class PrincipleAdmin(TranslatableAdmin):
 
 @admin.register(Stat)
 class StatAdmin(TranslatableAdmin):
-    list_display = ['name', 'count', 'order', 'created_at']
-    list_filter = ['created_at']
+    list_display = ['name', 'shown_value', 'source', 'order', 'created_at']
+    list_filter = ['source', 'created_at']
     search_fields = ['name']
-    readonly_fields = ['created_at']
\ No newline at end of file
+    readonly_fields = ['created_at']
+
+    def shown_value(self, obj):
+        return obj.value
+    shown_value.short_description = 'Value'
\ No newline at end of file
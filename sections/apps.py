@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class SectionsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "sections"
+
+    def ready(self):
+        from company.models import Newsletter
+        from events.models import GameSession
+        from events.rollups import seats_changed
+        from . import metrics
+        seats_changed.connect(metrics.seats_changed, dispatch_uid='sections.metrics.seats')
+        post_save.connect(metrics.session_changed, sender=GameSession, dispatch_uid='sections.metrics.session_saved')
+        post_delete.connect(metrics.session_deleted, sender=GameSession, dispatch_uid='sections.metrics.session_deleted')
+        post_save.connect(metrics.subscriber_saved, sender=Newsletter, dispatch_uid='sections.metrics.subscriber_saved')
+        post_delete.connect(metrics.subscriber_deleted, sender=Newsletter, dispatch_uid='sections.metrics.subscriber_deleted')
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from sections.metrics import COUNTS, recount_metrics
+
+'''
+python3 manage.py recount_stats
+
+Counts the live numbers the about page's stats can show (sections.metrics)
+from scratch. They follow bookings, sessions and subscriptions as those
+change; the nightly run moves "sessions held" on with the date and
+corrects any drift:
+
+5 0 * * * cd /var/www/vumgames && venv/bin/python manage.py recount_stats
+'''
+
+class Command(BaseCommand):
+    help = "Recount the live numbers shown by about page stats"
+
+    def add_arguments(self, parser):
+        parser.add_argument("metrics", nargs="*", help=f"Metrics to recount (default: all of {', '.join(COUNTS)})")
+
+    def handle(self, *args, **options):
+        unknown = set(options["metrics"]) - set(COUNTS)
+        if unknown:
+            raise CommandError(f"Unknown metrics: {', '.join(sorted(unknown))}")
+
+        values = recount_metrics(*options["metrics"])
+        for name, value in values.items():
+            self.stdout.write(f"  {name}: {value}")
+        self.stdout.write(self.style.SUCCESS(f"✅ Recounted {len(values)} metrics"))
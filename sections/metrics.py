@@ -0,0 +1,127 @@
+"""
+Live numbers for the about page's stats.
+
+    metric_values()                    # {'participants': 1234, ...}, cached
+    add_to_metric('subscribers', -1)
+    recount_metrics()                  # nightly
+
+Each metric is a row in the Metric table, so showing one is a cache hit (or
+a single small query) rather than an aggregate over bookings. The rows are
+kept current by the writes that change them: confirmed participants move
+by the seat deltas events.rollups reports as it refreshes a session, and
+subscribers by one per sign-up or unsubscribe. Sessions held and events
+run are recounted (a COUNT each) when a session is saved or deleted; as
+"held" also changes with the date, the nightly recount moves them on and
+corrects any drift in the others.
+"""
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.cache import bump_content_version, cached_for_version
+from core.purge import purge_content_groups
+from .models import METRIC_CHOICES, Metric
+
+
+def _participants():
+    from events.models import Booking
+    return Booking.objects.filter(is_confirmed=True).aggregate(
+        participants=Coalesce(Sum('participants'), 0),
+    )['participants']
+
+
+def _held_sessions():
+    from events.models import GameSession
+    return GameSession.objects.filter(is_active=True, date__lt=timezone.localdate())
+
+
+def _sessions_held():
+    return _held_sessions().count()
+
+
+def _events_run():
+    from events.models import Event
+    return Event.objects.filter(sessions__in=_held_sessions()).distinct().count()
+
+
+def _subscribers():
+    from company.models import Newsletter
+    return Newsletter.objects.filter(is_active=True).count()
+
+
+COUNTS = {
+    'participants': _participants,
+    'sessions_held': _sessions_held,
+    'events_run': _events_run,
+    'subscribers': _subscribers,
+}
+assert set(COUNTS) == {name for name, _label in METRIC_CHOICES}
+
+
+def _changed():
+    # Stats are shown on the about page
+    bump_content_version('about')
+    purge_content_groups('about')
+
+
+def _recount(names):
+    values = {}
+    for name in names:
+        values[name] = COUNTS[name]()
+        Metric.objects.update_or_create(name=name, defaults={'value': values[name]})
+    return values
+
+
+def metric_values():
+    """{metric name: value}, cached until the about page's content changes."""
+    def build():
+        values = dict(Metric.objects.values_list('name', 'value'))
+        # First use: count what has never been counted
+        missing = set(COUNTS) - set(values)
+        if missing:
+            values.update(_recount(missing))
+        return values
+    return cached_for_version('metric_values', 'about', build)
+
+
+def recount_metrics(*names):
+    """Count metrics (all by default) from scratch; returns {name: value}."""
+    values = _recount(names or COUNTS)
+    _changed()
+    return values
+
+
+def add_to_metric(name, delta):
+    if not Metric.objects.filter(name=name).update(value=F('value') + delta, updated_at=timezone.now()):
+        # Never counted; the count includes this change
+        _recount([name])
+    _changed()
+
+
+# ── Signal handlers (connected in SectionsConfig.ready) ──────────────────────
+
+def seats_changed(sender, delta, **kwargs):
+    add_to_metric('participants', delta)
+
+
+def session_changed(sender, **kwargs):
+    transaction.on_commit(lambda: recount_metrics('sessions_held', 'events_run'))
+
+
+def session_deleted(sender, **kwargs):
+    # Deleting a session deletes its bookings and their rollups wholesale
+    transaction.on_commit(lambda: recount_metrics('sessions_held', 'events_run', 'participants'))
+
+
+def subscriber_saved(sender, instance, created, **kwargs):
+    if created:
+        if instance.is_active:
+            transaction.on_commit(lambda: add_to_metric('subscribers', 1))
+    else:
+        # Edited in the admin; is_active may or may not have changed
+        transaction.on_commit(lambda: recount_metrics('subscribers'))
+
+
+def subscriber_deleted(sender, **kwargs):
+    transaction.on_commit(lambda: recount_metrics('subscribers'))
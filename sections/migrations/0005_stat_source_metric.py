@@ -0,0 +1,32 @@
+# Generated by Django 4.2 on 2026-10-19 17:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sections', '0004_bannertranslation_button1_bannertranslation_button2_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Metric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(choices=[('participants', 'Confirmed participants'), ('sessions_held', 'Sessions held'), ('events_run', 'Events run'), ('subscribers', 'Newsletter subscribers')], max_length=32, unique=True)),
+                ('value', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='stat',
+            name='source',
+            field=models.CharField(blank=True, choices=[('participants', 'Confirmed participants'), ('sessions_held', 'Sessions held'), ('events_run', 'Events run'), ('subscribers', 'Newsletter subscribers')], help_text='Show this live number instead of the count.', max_length=32),
+        ),
+        migrations.AlterField(
+            model_name='stat',
+            name='count',
+            field=models.PositiveIntegerField(default=0, help_text='Shown when no source is chosen.'),
+        ),
+    ]
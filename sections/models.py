@@ -76,11 +76,26 @@ class Principle(TranslatableModel):
         return self.safe_translation_getter("title", any_language=True)
     
 
+# Live numbers a Stat can show instead of a typed-in count (sections.metrics)
+METRIC_CHOICES = [
+    ('participants', 'Confirmed participants'),
+    ('sessions_held', 'Sessions held'),
+    ('events_run', 'Events run'),
+    ('subscribers', 'Newsletter subscribers'),
+]
+
+
 class Stat(TranslatableModel):
     translations = TranslatedFields(
         name=models.CharField(max_length=255),
     )
-    count = models.PositiveIntegerField()
+    count = models.PositiveIntegerField(default=0, help_text="Shown when no source is chosen.")
+    source = models.CharField(
+        max_length=32,
+        choices=METRIC_CHOICES,
+        blank=True,
+        help_text="Show this live number instead of the count."
+    )
     order = models.PositiveSmallIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -88,4 +103,21 @@ class Stat(TranslatableModel):
         ordering = ["order"]
 
     def __str__(self):
-        return self.safe_translation_getter("name", any_language=True)
\ No newline at end of file
+        return self.safe_translation_getter("name", any_language=True)
+
+    @property
+    def value(self):
+        if not self.source:
+            return self.count
+        from .metrics import metric_values
+        return metric_values().get(self.source, 0)
+
+
+class Metric(models.Model):
+    """Current value of one of METRIC_CHOICES, kept up to date by sections.metrics."""
+    name = models.CharField(max_length=32, choices=METRIC_CHOICES, unique=True)
+    value = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
\ No newline at end of file
@@ -23,13 +23,32 @@ EMAIL_HOST_USER = config("EMAIL_HOST_USER", default="")
 EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD", default="")
 DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL", default="noreply@example.com")
 
+# Public address of the site, for links in emails sent outside a request
+SITE_URL = config("SITE_URL", default="https://vumgames.com")
+
 # Payment Gateway Configuration
 STRIPE_PUBLISHABLE_KEY = config("STRIPE_PUBLISHABLE_KEY", default="")
 STRIPE_SECRET_KEY = config("STRIPE_SECRET_KEY", default="")
 STRIPE_WEBHOOK_SECRET = config("STRIPE_WEBHOOK_SECRET", default="")
+# Point at stripe-mock or another stand-in for local testing
+STRIPE_API_BASE = config("STRIPE_API_BASE", default="https://api.stripe.com")
 
 PAYPAL_CLIENT_ID = config("PAYPAL_CLIENT_ID", default='')
 PAYPAL_SECRET = config("PAYPAL_SECRET", default='')
+PAYPAL_API_BASE = config("PAYPAL_API_BASE", default="https://api-m.paypal.com")
+# Set to verify PayPal webhook signatures (PayPal developer dashboard)
+PAYPAL_WEBHOOK_ID = config("PAYPAL_WEBHOOK_ID", default="")
+
+# Payment provider calls (events.payments): per-attempt timeouts in
+# seconds, retries of transient failures, and a cap on the whole call so a
+# slow provider can't hold a worker anywhere near gunicorn's 60 s timeout
+PAYMENT_CONNECT_TIMEOUT = config("PAYMENT_CONNECT_TIMEOUT", cast=float, default=3.05)
+PAYMENT_READ_TIMEOUT = config("PAYMENT_READ_TIMEOUT", cast=float, default=8.0)
+PAYMENT_MAX_RETRIES = config("PAYMENT_MAX_RETRIES", cast=int, default=2)
+PAYMENT_CALL_BUDGET = config("PAYMENT_CALL_BUDGET", cast=float, default=20.0)
+# Consecutive failures before a provider is skipped, and for how long
+PAYMENT_BREAKER_THRESHOLD = config("PAYMENT_BREAKER_THRESHOLD", cast=int, default=5)
+PAYMENT_BREAKER_RESET = config("PAYMENT_BREAKER_RESET", cast=float, default=30.0)
 
 # Application definition
 INSTALLED_APPS = [
@@ -42,6 +61,7 @@ INSTALLED_APPS = [
     "django_extensions",
     "sslserver",
     "parler",
+    'core',
     'company',
     'events',
     'games',
@@ -67,14 +87,25 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
-        "APP_DIRS": True,
         "OPTIONS": {
+            # Parsed templates are kept in memory in production; in
+            # development they are re-read so edits show up immediately.
+            "loaders": [
+                "django.template.loaders.filesystem.Loader",
+                "django.template.loaders.app_directories.Loader",
+            ] if DEBUG else [
+                ("django.template.loaders.cached.Loader", [
+                    "django.template.loaders.filesystem.Loader",
+                    "django.template.loaders.app_directories.Loader",
+                ]),
+            ],
             "context_processors": [
                 "django.template.context_processors.debug",
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 'company.context_processors.company_context',
+                'core.context_processors.content_versions',
             ],
         },
     },
@@ -87,9 +118,33 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db" / "db.sqlite3",
+        # On disk rather than in memory, so tests that book from several
+        # threads wait for each other's writes like the site does
+        "TEST": {"NAME": BASE_DIR / "db" / "test.sqlite3"},
     }
 }
 
+# Cache (template fragments, content-version tokens). Every gunicorn worker
+# must see a content-version bump, so the default is shared on disk rather
+# than per process; a culled version key only invalidates early
+CACHES = {
+    "default": {
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": config("CACHE_LOCATION", default=str(BASE_DIR / "cache" / "default")),
+        "OPTIONS": {"MAX_ENTRIES": config("CACHE_MAX_ENTRIES", cast=int, default=5000)},
+    },
+    # Rate-limit counters (core.ratelimit); shared by all gunicorn workers
+    # so a limit holds across them
+    "ratelimit": {
+        "BACKEND": config("RATELIMIT_CACHE_BACKEND", default="django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": config("RATELIMIT_CACHE_LOCATION", default=str(BASE_DIR / "cache" / "ratelimit")),
+    },
+}
+RATELIMIT_ENABLED = config("RATELIMIT_ENABLED", cast=bool, default=True)
+
+# nginx micro-cache refresh listener (nginx-microcache.conf); empty = disabled
+NGINX_CACHE_REFRESH_URL = config("NGINX_CACHE_REFRESH_URL", default="")
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -4,6 +4,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.utils.translation import gettext_lazy as _
+import company.views as company_views
 import events.views as event_views
 
 urlpatterns = [
@@ -12,8 +13,11 @@ urlpatterns = [
     path('paypal/webhook/', event_views.paypal_webhook, name='paypal_webhook'), # https://vumgames.com/games/paypal/webhook/
 ]
 
+# Pages render no CSRF token, which keeps them cacheable by nginx (see
+# nginx-microcache.conf); their forms fetch one from csrf-token/ on submit
 urlpatterns += [
     path('set-language/', set_language, name='set_language'),
+    path('csrf-token/', company_views.csrf_token, name='csrf_token'),
 ]
 
 urlpatterns += i18n_patterns(